@@ -6,6 +6,7 @@ import os
 import json
 from scipy import ndimage
 from sklearn.cluster import KMeans
+from noise_estimation import estimate_noise, find_noise_outliers
 import sys
 import warnings
 warnings.filterwarnings('ignore')
@@ -71,33 +72,13 @@ class SingleImageTamperingDetector:
         else:
             gray = image.copy()
         
-        # Apply high-pass filter to extract noise
-        kernel = np.array([[-1, -1, -1], [-1, 8, -1], [-1, -1, -1]])
-        noise = cv2.filter2D(gray, -1, kernel)
-        
-        # Divide image into blocks and analyze noise variance
+        # Per-block noise sigma from the wavelet HH subband (MAD estimate)
         block_size = 32
-        height, width = gray.shape
-        variances = []
-        positions = []
-        
-        for i in range(0, height - block_size, block_size):
-            for j in range(0, width - block_size, block_size):
-                block_noise = noise[i:i+block_size, j:j+block_size]
-                var = np.var(block_noise)
-                variances.append(var)
-                positions.append((i, j))
-        
-        if len(variances) > 0:
-            variances = np.array(variances)
-            mean_var = np.mean(variances)
-            std_var = np.std(variances)
-            
+        sigma, noise_map = estimate_noise(gray, tile_size=block_size)
+        
+        if noise_map.size > 0:
             # Find outliers (potential tampered regions)
-            outliers = []
-            for i, var in enumerate(variances):
-                if abs(var - mean_var) > 2 * std_var:
-                    outliers.append((positions[i], var))
+            outliers = find_noise_outliers(noise_map, tile_size=block_size)
             
             confidence = min(len(outliers) * 0.05, 1.0) if outliers else 0.0
             return outliers, confidence
@@ -2,12 +2,11 @@ import os
 import glob
 import json
 from quality_based_detector import QualityBasedTamperingDetector
+from metadata_analysis import triage_files
 import time
 
-def batch_test_images(folder_path, output_file=None):
-    """Test multiple images in a folder"""
-    detector = QualityBasedTamperingDetector()
-    
+def find_image_files(folder_path):
+    """List supported images in a folder"""
     # Supported image extensions
     extensions = ['*.jpg', '*.jpeg', '*.png', '*.bmp', '*.tiff', '*.tif', '*.gif', '*.webp']
     
@@ -16,6 +15,39 @@ def batch_test_images(folder_path, output_file=None):
         image_files.extend(glob.glob(os.path.join(folder_path, ext)))
         image_files.extend(glob.glob(os.path.join(folder_path, ext.upper())))
     
+    return sorted(set(image_files))
+
+def triage_images(folder_path, output_file=None):
+    """Metadata-only triage: prioritized list of files for full analysis"""
+    image_files = find_image_files(folder_path)
+    if not image_files:
+        print(f"No image files found in {folder_path}")
+        return []
+    
+    start_time = time.time()
+    ranked = triage_files(image_files)
+    elapsed = time.time() - start_time
+    
+    print(f"Triaged {len(ranked)} images in {elapsed:.2f} seconds (metadata only)")
+    print("=" * 60)
+    for i, entry in enumerate(ranked, 1):
+        print(f"{i:4d}. [{entry['triage_score']:3d}] {os.path.basename(entry['path'])} - {', '.join(entry['reasons']) or 'metadata intact'}")
+    
+    if output_file:
+        with open(output_file, 'w') as f:
+            json.dump({'triage': ranked, 'analysis_timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+                       'folder_analyzed': folder_path}, f, indent=2, default=str)
+        print(f"\n📄 Triage list saved to: {output_file}")
+    
+    return ranked
+
+def batch_test_images(folder_path, output_file=None, image_files=None):
+    """Test multiple images in a folder"""
+    detector = QualityBasedTamperingDetector()
+    
+    if image_files is None:
+        image_files = find_image_files(folder_path)
+    
     if not image_files:
         print(f"No image files found in {folder_path}")
         return
@@ -34,12 +66,19 @@ def batch_test_images(folder_path, output_file=None):
     
     start_time = time.time()
     
+    # Same-size images are scored together in vectorized batches
+    try:
+        analyses = detector.score_batch(image_files)
+    except Exception as e:
+        print(f"Batched scoring failed ({e}), falling back to per-image analysis")
+        analyses = [None] * len(image_files)
+    
     for i, image_path in enumerate(image_files, 1):
         print(f"\n[{i}/{len(image_files)}] Analyzing: {os.path.basename(image_path)}")
         
         try:
             # Analyze image
-            result = detector.analyze_image_quality(image_path)
+            result = analyses[i - 1] or detector.analyze_image_quality(image_path)
             
             if "error" not in result:
                 # Extract key information
@@ -140,6 +179,8 @@ def main():
     parser.add_argument('folder', help='Folder containing images to analyze')
     parser.add_argument('--output', '-o', help='Output JSON file for detailed results')
     parser.add_argument('--quick', '-q', action='store_true', help='Quick mode - minimal output')
+    parser.add_argument('--triage', action='store_true', help='Metadata-only triage (no pixel analysis)')
+    parser.add_argument('--top', type=int, help='With --triage, fully analyze only the N highest-priority files')
     
     args = parser.parse_args()
     
@@ -154,7 +195,14 @@ def main():
     print("🔍 Quality-Based Image Tampering Detection - Batch Mode")
     print(f"📁 Analyzing folder: {args.folder}")
     
-    results, stats = batch_test_images(args.folder, args.output)
+    if args.triage:
+        ranked = triage_images(args.folder, None if args.top else args.output)
+        if not args.top:
+            return
+        priority_files = [entry['path'] for entry in ranked[:args.top]]
+        results, stats = batch_test_images(args.folder, args.output, image_files=priority_files)
+    else:
+        results, stats = batch_test_images(args.folder, args.output)
     
     if args.quick:
         print(f"\nQuick Summary: {stats['high_risk']} high-risk, {stats['medium_risk']} medium-risk, {stats['low_risk']} low-risk images")
@@ -35,6 +35,9 @@ class CelebrityDatasetCreator:
             "Lupita Nyongo", "Viola Davis", "Mahershala Ali"
         ]
         
+        # Tampered region per tampered file, saved with the dataset metadata
+        self.tampering_regions = {}
+        
         # Sample celebrity image URLs (these are placeholder URLs - in real implementation, you'd use proper image search APIs)
         self.sample_urls = self.generate_sample_celebrity_urls()
     
@@ -93,6 +96,7 @@ class CelebrityDatasetCreator:
             
             # Save tampered version
             tampered_filename = f"tampered_{filename}"
+            self.tampering_regions[tampered_filename] = self.last_region
             tampered_path = os.path.join(self.tampered_dir, tampered_filename)
             cv2.imwrite(tampered_path, cv2.cvtColor(tampered_img, cv2.COLOR_RGB2BGR))
             print(f"Created tampered image: {tampered_filename}")
@@ -102,6 +106,9 @@ class CelebrityDatasetCreator:
         random.seed(seed)  # For reproducible results
         tampering_type = random.choice(['copy_move', 'splicing', 'lighting_change', 'noise_addition', 'compression'])
         
+        # Each technique records the area it changed: boxes are [x, y, w, h], circles [cx, cy, r]
+        self.last_region = {"type": tampering_type}
+        
         if tampering_type == 'copy_move':
             return self.apply_copy_move_forgery(img)
         elif tampering_type == 'splicing':
@@ -134,6 +141,7 @@ class CelebrityDatasetCreator:
         paste_y = random.randint(10, h - size - 10)
         
         img[paste_y:paste_y + (y2-y1), paste_x:paste_x + (x2-x1)] = region
+        self.last_region["boxes"] = [[paste_x, paste_y, x2 - x1, y2 - y1]]
         
         return img
     
@@ -149,6 +157,7 @@ class CelebrityDatasetCreator:
         # Insert object with different color/texture
         color = (random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
         cv2.rectangle(img, (obj_x, obj_y), (obj_x + obj_w, obj_y + obj_h), color, -1)
+        self.last_region["boxes"] = [[obj_x, obj_y, obj_w + 1, obj_h + 1]]
         
         return img
     
@@ -161,6 +170,7 @@ class CelebrityDatasetCreator:
         center_x, center_y = random.randint(w//4, 3*w//4), random.randint(h//4, 3*h//4)
         radius = random.randint(50, 100)
         cv2.circle(mask, (center_x, center_y), radius, 255, -1)
+        self.last_region["circles"] = [[center_x, center_y, radius]]
         
         # Apply brightness change to the masked region
         brightness_factor = random.uniform(0.3, 2.0)
@@ -188,6 +198,7 @@ class CelebrityDatasetCreator:
         # Apply only to selected region
         result = img.copy()
         result[y1:y2, x1:x2] = noisy_img[y1:y2, x1:x2]
+        self.last_region["boxes"] = [[x1, y1, x2 - x1, y2 - y1]]
         
         return result
     
@@ -202,6 +213,7 @@ class CelebrityDatasetCreator:
         pil_img.save(buffer, format='JPEG', quality=10)  # Very low quality
         buffer.seek(0)
         compressed_img = Image.open(buffer)
+        self.last_region["whole_image"] = True
         
         return np.array(compressed_img)
     
@@ -226,7 +238,8 @@ class CelebrityDatasetCreator:
                 "lighting_change", 
                 "noise_addition",
                 "compression_artifacts"
-            ]
+            ],
+            "tampering_regions": self.tampering_regions
         }
         
         metadata_path = os.path.join(self.dataset_dir, "dataset_metadata.json")
@@ -0,0 +1,90 @@
+import os
+import joblib
+import numpy as np
+
+# Nearest labelled examples for a prediction, so reviewers can compare a
+# flagged image with the most similar known-tampered and known-original
+# images. One KD-tree per label over the scaled feature vectors; samples added
+# later sit in a small brute-force buffer that is folded into the tree once it
+# grows past a fraction of the indexed size.
+
+EXEMPLAR_INDEX_FILENAME = "exemplar_index.joblib"
+LABEL_NAMES = {0: "original", 1: "tampered"}
+
+
+class ExemplarIndex:
+    def __init__(self, feature_version, rebuild_fraction=0.1, min_rebuild=256, leaf_size=40, bundle_id=None):
+        self.feature_version = feature_version
+        # Model bundle whose scaler produced the indexed vectors
+        self.bundle_id = bundle_id
+        self.rebuild_fraction = rebuild_fraction
+        self.min_rebuild = min_rebuild
+        self.leaf_size = leaf_size
+        self._points = {}
+        self._filenames = {}
+        self._trees = {}
+        self._indexed = {}
+
+    def __len__(self):
+        return sum(len(names) for names in self._filenames.values())
+
+    def _rebuild(self, label):
+        from sklearn.neighbors import KDTree
+        self._trees[label] = KDTree(self._points[label], leaf_size=self.leaf_size)
+        self._indexed[label] = len(self._points[label])
+
+    def add(self, features_scaled, labels, filenames):
+        """Insert labelled samples; trees are rebuilt only when the buffer gets large"""
+        features_scaled = np.asarray(features_scaled, dtype=np.float64)
+        labels = np.asarray(labels)
+        for label in np.unique(labels):
+            label = int(label)
+            rows = labels == label
+            if label in self._points:
+                self._points[label] = np.vstack([self._points[label], features_scaled[rows]])
+            else:
+                self._points[label] = features_scaled[rows]
+                self._indexed[label] = 0
+            self._filenames.setdefault(label, []).extend(np.asarray(filenames, dtype=object)[rows])
+
+            pending = len(self._points[label]) - self._indexed[label]
+            if self._indexed[label] == 0 or pending > max(self.min_rebuild, self.rebuild_fraction * self._indexed[label]):
+                self._rebuild(label)
+
+    def query(self, features_scaled, k=3):
+        """Per query row: {label_name: [{"filename", "label", "distance"}, ...]} nearest first"""
+        X = np.atleast_2d(np.asarray(features_scaled, dtype=np.float64))
+        results = [{} for _ in range(len(X))]
+        for label, points in self._points.items():
+            indexed = self._indexed[label]
+            k_tree = min(k, indexed)
+            distances, indices = self._trees[label].query(X, k=k_tree)
+
+            pending = points[indexed:]
+            if len(pending):
+                # Exact distances to the unindexed buffer, merged with the tree hits
+                buffer_distances = np.sqrt(((X[:, np.newaxis, :] - pending[np.newaxis]) ** 2).sum(axis=-1))
+                distances = np.hstack([distances, buffer_distances])
+                indices = np.hstack([indices, np.arange(indexed, len(points))[np.newaxis].repeat(len(X), 0)])
+                order = np.argsort(distances, axis=1, kind='stable')[:, :k]
+                distances = np.take_along_axis(distances, order, axis=1)
+                indices = np.take_along_axis(indices, order, axis=1)
+
+            filenames = self._filenames[label]
+            for row in range(len(X)):
+                results[row][LABEL_NAMES.get(label, str(label))] = [
+                    {"filename": filenames[i], "label": LABEL_NAMES.get(label, str(label)), "distance": float(d)}
+                    for i, d in zip(indices[row], distances[row])
+                ]
+        return results
+
+    def save(self, path):
+        """Write the index atomically"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        joblib.dump(self, tmp_path, compress=0)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path):
+        return joblib.load(path)
@@ -0,0 +1,258 @@
+import os
+import threading
+from functools import lru_cache
+import cv2
+import numpy as np
+from noise_estimation import haar_hh_subband, MAD_SCALE
+from frequency_analysis import block_dct, azimuthal_power_spectrum, upsampling_artifact_score
+
+# Face-ROI analysis: deepfake artifacts live on the face, so the forensic
+# detectors run on face crops (plus margin) and are compared with same-size
+# reference windows sampled from the rest of the image. Cost stays
+# proportional to face area instead of image area.
+
+FACE_DNN_PROTOTXT = os.path.join("models", "deploy.prototxt")
+FACE_DNN_MODEL = os.path.join("models", "res10_300x300_ssd_iter_140000.caffemodel")
+
+_detector_lock = threading.Lock()
+_face_detector = None
+
+
+def get_face_detector():
+    """Return ('dnn'|'cascade', model), loaded once per process"""
+    global _face_detector
+    with _detector_lock:
+        if _face_detector is None:
+            if os.path.exists(FACE_DNN_PROTOTXT) and os.path.exists(FACE_DNN_MODEL):
+                net = cv2.dnn.readNetFromCaffe(FACE_DNN_PROTOTXT, FACE_DNN_MODEL)
+                _face_detector = ("dnn", net)
+            elif hasattr(cv2, 'data') and hasattr(cv2, 'CascadeClassifier'):
+                cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+                _face_detector = ("cascade", None if cascade.empty() else cascade)
+            else:
+                _face_detector = ("cascade", None)
+        return _face_detector
+
+
+def _to_gray(image):
+    """Grayscale uint8 view of an RGB, RGBA or gray array"""
+    if len(image.shape) == 2:
+        return image
+    if image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_RGBA2GRAY)
+    return cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+
+
+def detect_faces(image, proxy_size=640, min_face=30):
+    """Detect faces on a downscaled proxy; boxes (x, y, w, h) in full resolution"""
+    kind, model = get_face_detector()
+    if model is None:
+        return []
+
+    h, w = image.shape[:2]
+    scale = min(1.0, proxy_size / float(max(h, w)))
+    if kind == "dnn":
+        proxy = image if scale == 1.0 else cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        if len(proxy.shape) == 2:
+            proxy = cv2.cvtColor(proxy, cv2.COLOR_GRAY2RGB)
+        # res10 SSD was trained on BGR with the BGR mean (104, 177, 123)
+        blob = cv2.dnn.blobFromImage(cv2.cvtColor(proxy[:, :, :3], cv2.COLOR_RGB2BGR), 1.0, (300, 300),
+                                     (104.0, 177.0, 123.0), swapRB=False)
+        with _detector_lock:
+            model.setInput(blob)
+            detections = model.forward()[0, 0]
+
+        faces = []
+        for det in detections:
+            if det[2] < 0.5:
+                continue
+            x0, y0, x1, y1 = np.clip(det[3:7], 0, 1) * [w, h, w, h]
+            if x1 - x0 >= min_face and y1 - y0 >= min_face:
+                faces.append((int(x0), int(y0), int(x1 - x0), int(y1 - y0)))
+        return faces
+
+    gray = _to_gray(image)
+    if scale < 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    min_size = max(int(min_face * scale), 12)
+    boxes = model.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(min_size, min_size))
+    return [tuple(int(round(v / scale)) for v in box) for box in boxes]
+
+
+def _expand_box(box, margin, shape, grid=8):
+    """Add margin and snap to the JPEG 8x8 grid so ELA/DCT stay aligned"""
+    x, y, w, h = box
+    mx, my = int(w * margin), int(h * margin)
+    x0 = max(0, (x - mx) // grid * grid)
+    y0 = max(0, (y - my) // grid * grid)
+    x1 = min(shape[1], x + w + mx)
+    y1 = min(shape[0], y + h + my)
+    return x0, y0, x1, y1
+
+
+def error_level(image, quality=90):
+    """Mean absolute error after re-saving as JPEG (error level analysis)"""
+    bgr = cv2.cvtColor(image, cv2.COLOR_RGB2BGR) if len(image.shape) == 3 else image
+    ok, buffer = cv2.imencode('.jpg', bgr, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        return 0.0
+    resaved = cv2.imdecode(buffer, cv2.IMREAD_UNCHANGED)
+    return float(np.mean(cv2.absdiff(bgr, resaved)))
+
+
+def region_metrics(region):
+    """Noise, JPEG, ELA and frequency metrics for one crop"""
+    gray = _to_gray(region)
+
+    noise_sigma = float(np.median(np.abs(haar_hh_subband(gray))) / MAD_SCALE)
+
+    dct = block_dct(gray)
+    jpeg_high_freq = float(np.mean(np.sum(np.abs(dct[:, :, 4:, 4:]), axis=(-2, -1)))) if dct.size else 0.0
+
+    n_bins = max(16, min(64, min(gray.shape) // 4))
+    spectrum = azimuthal_power_spectrum(gray, n_bins)
+
+    return {
+        "noise_sigma": noise_sigma,
+        "jpeg_high_freq": jpeg_high_freq,
+        "error_level": error_level(region[:, :, :3] if len(region.shape) == 3 else region),
+        "upsampling_score": upsampling_artifact_score(spectrum)
+    }
+
+
+def _baseline_windows(faces, shape, samples_per_face=2):
+    """Same-size windows that do not overlap any face, spread over the image"""
+    windows = []
+    for x0, y0, x1, y1 in faces:
+        bw, bh = x1 - x0, y1 - y0
+        candidates = []
+        for wy in range(0, shape[0] - bh + 1, max(bh // 2, 8)):
+            for wx in range(0, shape[1] - bw + 1, max(bw // 2, 8)):
+                overlaps = any(wx < fx1 and wx + bw > fx0 and wy < fy1 and wy + bh > fy0
+                               for fx0, fy0, fx1, fy1 in faces)
+                if not overlaps:
+                    candidates.append((wx, wy, wx + bw, wy + bh))
+        if candidates:
+            picks = np.linspace(0, len(candidates) - 1, min(samples_per_face, len(candidates)))
+            windows.extend(candidates[int(round(i))] for i in picks)
+    return windows
+
+
+def _inconsistency(face, baseline):
+    """0-1 score of how far face metrics deviate from the baseline"""
+    terms = []
+    for key in ("noise_sigma", "jpeg_high_freq", "error_level"):
+        ratio = (face[key] + 1e-3) / (baseline[key] + 1e-3)
+        terms.append(min(abs(np.log2(ratio)), 1.0))
+    terms.append(min(abs(face["upsampling_score"] - baseline["upsampling_score"]) * 2.0, 1.0))
+    return float(np.mean(terms))
+
+
+@lru_cache(maxsize=4)
+def _ring_masks(size, context):
+    """Inside / on / outside masks of the face ellipse in a canonical crop"""
+    coords = (np.arange(size, dtype=np.float32) + 0.5) / size - 0.5
+    yy, xx = np.meshgrid(coords, coords, indexing='ij')
+    # Face box spans 1/context of the crop; the ellipse is slightly taller
+    radius = np.sqrt((xx / (0.5 / context)) ** 2 + (yy / (0.55 / context)) ** 2)
+    inside = radius < 0.8
+    ring = (radius >= 0.9) & (radius <= 1.1)
+    outside = (radius > 1.2) & (radius < 1.5)
+    return np.stack([inside, ring, outside]).reshape(3, -1).astype(np.float32)
+
+
+def blending_scores(image, faces, size=128, context=1.6):
+    """Per-face blending seam statistics around an elliptical face boundary"""
+    masks = _ring_masks(size, context)
+    counts = masks.sum(axis=1)
+    h, w = image.shape[:2]
+    results = []
+
+    for x, y, fw, fh in faces:
+        # Fixed-size crop around the face keeps cost independent of image size
+        cx, cy = x + fw / 2.0, y + fh / 2.0
+        half_w, half_h = fw * context / 2.0, fh * context / 2.0
+        x0, y0 = int(max(0, cx - half_w)), int(max(0, cy - half_h))
+        x1, y1 = int(min(w, cx + half_w)), int(min(h, cy + half_h))
+        if x1 - x0 < 16 or y1 - y0 < 16:
+            continue
+
+        # Pad clipped crops at the border so the ellipse stays centred
+        crop = image[y0:y1, x0:x1]
+        pad = (int(max(0, half_h - cy)), int(max(0, cy + half_h - h)),
+               int(max(0, half_w - cx)), int(max(0, cx + half_w - w)))
+        if any(pad):
+            crop = cv2.copyMakeBorder(crop, *pad, cv2.BORDER_REFLECT)
+        crop = cv2.resize(crop, (size, size), interpolation=cv2.INTER_AREA)
+        if len(crop.shape) == 2:
+            crop = cv2.cvtColor(crop, cv2.COLOR_GRAY2RGB)
+        crop = crop[:, :, :3]
+
+        ycrcb = cv2.cvtColor(crop, cv2.COLOR_RGB2YCrCb).astype(np.float32)
+        luma = ycrcb[:, :, 0]
+        gradient = cv2.magnitude(cv2.Sobel(luma, cv2.CV_32F, 1, 0), cv2.Sobel(luma, cv2.CV_32F, 0, 1))
+        noise = np.abs(luma - cv2.blur(luma, (3, 3)))
+        chroma = (cv2.magnitude(cv2.Sobel(ycrcb[:, :, 1], cv2.CV_32F, 1, 0), cv2.Sobel(ycrcb[:, :, 1], cv2.CV_32F, 0, 1)) +
+                  cv2.magnitude(cv2.Sobel(ycrcb[:, :, 2], cv2.CV_32F, 1, 0), cv2.Sobel(ycrcb[:, :, 2], cv2.CV_32F, 0, 1)))
+
+        # Masked means for all statistics in one matrix product: (region, stat)
+        stats = np.stack([gradient, noise, chroma]).reshape(3, -1)
+        means = (masks @ stats.T) / counts[:, None]
+        inside, ring, outside = means + 1e-3
+
+        seam_gradient = ring[0] / max(inside[0], outside[0]) - 1.0
+        seam_color = ring[2] / max(inside[2], outside[2]) - 1.0
+        noise_mismatch = abs(np.log2(inside[1] / outside[1]))
+        score = np.mean([np.clip(seam_gradient, 0, 1), np.clip(seam_color, 0, 1), min(noise_mismatch, 1.0)])
+
+        results.append({
+            "box": (int(x), int(y), int(fw), int(fh)),
+            "blending_score": float(score),
+            "seam_gradient_ratio": float(ring[0] / max(inside[0], outside[0])),
+            "seam_color_ratio": float(ring[2] / max(inside[2], outside[2])),
+            "noise_ratio": float(inside[1] / outside[1])
+        })
+
+    return results
+
+
+class FaceROIAnalyzer:
+    def __init__(self, margin=0.25, proxy_size=640, baseline_samples=2):
+        self.margin = margin
+        self.proxy_size = proxy_size
+        self.baseline_samples = baseline_samples
+
+    def analyze(self, image, faces=None):
+        """Run the forensic metrics on each face crop and on a baseline"""
+        if faces is None:
+            faces = detect_faces(image, proxy_size=self.proxy_size)
+
+        results = {"faces": [], "baseline": None, "blending": [], "confidence": 0.0}
+        if len(faces) == 0:
+            return results
+
+        boxes = [_expand_box(face, self.margin, image.shape) for face in faces]
+
+        # Baseline from non-face windows of the same size as each face crop;
+        # when faces fill the frame the whole image is only about face-sized
+        windows = _baseline_windows(boxes, image.shape, self.baseline_samples)
+        if not windows:
+            windows = [(0, 0, image.shape[1], image.shape[0])]
+        window_metrics = [region_metrics(image[y0:y1, x0:x1]) for x0, y0, x1, y1 in windows]
+        baseline = {key: float(np.median([m[key] for m in window_metrics])) for key in window_metrics[0]}
+        results["baseline"] = baseline
+
+        for face, (x0, y0, x1, y1) in zip(faces, boxes):
+            metrics = region_metrics(image[y0:y1, x0:x1])
+            score = _inconsistency(metrics, baseline)
+            results["faces"].append({
+                "box": tuple(int(v) for v in face),
+                "metrics": metrics,
+                "inconsistency": score
+            })
+
+        results["blending"] = blending_scores(image, faces)
+        scores = [f["inconsistency"] for f in results["faces"]]
+        scores += [b["blending_score"] for b in results["blending"]]
+        results["confidence"] = max(scores)
+        return results
@@ -0,0 +1,222 @@
+import os
+import glob
+import json
+import time
+import argparse
+import cv2
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.svm import SVC
+from sklearn.preprocessing import StandardScaler
+from sklearn.model_selection import StratifiedGroupKFold, GroupShuffleSplit
+from ml_tampering_detector import MLTamperingDetector, FEATURE_GROUPS, source_image_name
+from feature_store import FeatureStore
+
+# Cost-aware feature pruning. Each feature group is timed on real images and
+# scored by random-forest importance and by grouped permutation importance
+# (all columns of a group shuffled together) under cross-validation. Groups
+# with the least importance per millisecond are dropped greedily while the
+# cross-validated ensemble accuracy stays within a tolerance. Importances and
+# pruning only see a training split; the accuracy delta is reported on a
+# held-out split that played no part in choosing the groups. Splits keep an
+# original and its tampered copy together. The result is a "fast profile":
+# the kept groups, a model retrained on them and the measured latency saving
+# and accuracy delta. The model's bundle records the profile, so
+# MLTamperingDetector.from_models_dir loads it with the right extractor.
+
+PROFILE_FILENAME = "feature_profile.json"
+
+
+def group_columns():
+    """{group: column indices} in the full feature vector"""
+    columns, start = {}, 0
+    for group, _, _, names in FEATURE_GROUPS:
+        columns[group] = list(range(start, start + len(names)))
+        start += len(names)
+    return columns
+
+
+def _median_ms(function, repeats=3):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+
+def measure_group_costs(detector, image_paths, repeats=3):
+    """Median milliseconds per image for each feature group"""
+    costs = {group: [] for group, _, _, _ in FEATURE_GROUPS}
+    for path in image_paths:
+        image_rgb = cv2.cvtColor(cv2.imread(path), cv2.COLOR_BGR2RGB)
+        gray = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2GRAY)
+        for group, method, source, _ in FEATURE_GROUPS:
+            extractor = getattr(detector, method)
+            image = gray if source == "gray" else image_rgb
+            costs[group].append(_median_ms(lambda: extractor(image), repeats))
+    return {group: float(np.median(values)) for group, values in costs.items()}
+
+
+def measure_extraction_latency(detector, image_paths, repeats=3):
+    """Median end-to-end extract_advanced_features time per image (ms)"""
+    return float(np.median([_median_ms(lambda: detector.extract_advanced_features(path), repeats)
+                            for path in image_paths]))
+
+
+def _fit_ensemble(X, y):
+    scaler = StandardScaler().fit(X)
+    rf = RandomForestClassifier(n_estimators=100, random_state=42).fit(scaler.transform(X), y)
+    svm = SVC(kernel='rbf', probability=True, random_state=42).fit(scaler.transform(X), y)
+    return scaler, rf, svm
+
+
+def _ensemble_accuracy(models, X, y):
+    scaler, rf, svm = models
+    X_scaled = scaler.transform(X)
+    probs = (rf.predict_proba(X_scaled)[:, 1] + svm.predict_proba(X_scaled)[:, 1]) / 2
+    return float(np.mean((probs > 0.5).astype(int) == y))
+
+
+def _folds(y, sources, n_folds, random_state):
+    """Stratified CV folds that never split the images of one source across train and test"""
+    return StratifiedGroupKFold(n_folds, shuffle=True, random_state=random_state).split(y, y, sources)
+
+
+def cv_accuracy(X, y, sources, columns, n_folds=5, random_state=42):
+    """Cross-validated RF + SVM ensemble accuracy using only the given columns"""
+    folds = _folds(y, sources, n_folds, random_state)
+    scores = []
+    for train_idx, test_idx in folds:
+        models = _fit_ensemble(X[train_idx][:, columns], y[train_idx])
+        scores.append(_ensemble_accuracy(models, X[test_idx][:, columns], y[test_idx]))
+    return float(np.mean(scores))
+
+
+def holdout_accuracy(X_train, y_train, X_test, y_test, columns):
+    """Ensemble accuracy on a held-out split, trained on the given columns of the training split"""
+    models = _fit_ensemble(X_train[:, columns], y_train)
+    return _ensemble_accuracy(models, X_test[:, columns], y_test)
+
+
+def group_importances(X, y, sources, groups, n_folds=5, n_repeats=5, random_state=42):
+    """Per-group (rf_importance, permutation_drop), averaged over CV folds"""
+    rng = np.random.RandomState(random_state)
+    rf_importance = {group: [] for group in groups}
+    permutation_drop = {group: [] for group in groups}
+    for train_idx, test_idx in _folds(y, sources, n_folds, random_state):
+        models = _fit_ensemble(X[train_idx], y[train_idx])
+        X_test, y_test = X[test_idx], y[test_idx]
+        baseline = _ensemble_accuracy(models, X_test, y_test)
+        for group, columns in groups.items():
+            rf_importance[group].append(models[1].feature_importances_[columns].sum())
+            for _ in range(n_repeats):
+                # Shuffle the group's columns jointly so correlated features cannot stand in
+                permuted = X_test.copy()
+                permuted[:, columns] = X_test[rng.permutation(len(X_test))][:, columns]
+                permutation_drop[group].append(baseline - _ensemble_accuracy(models, permuted, y_test))
+    return {group: (float(np.mean(rf_importance[group])), float(np.mean(permutation_drop[group])))
+            for group in groups}
+
+
+def select_profile(X, y, sources, groups, costs, importances, max_accuracy_drop=0.01, n_folds=5):
+    """Greedily drop the least valuable groups per ms; returns (kept, dropped)
+
+    The CV accuracies steer the selection only: having picked the groups,
+    they are biased upwards and are not a fair estimate of the delta.
+    """
+    rf_total = sum(rf for rf, _ in importances.values()) or 1.0
+    drop_total = sum(max(drop, 0) for _, drop in importances.values())
+    value = {}
+    for group, (rf, drop) in importances.items():
+        # Both importances normalized to shares; permutation only when it shows anything
+        share = rf / rf_total
+        if drop_total > 0:
+            share = (share + max(drop, 0) / drop_total) / 2
+        value[group] = share / max(costs[group], 1e-3)
+
+    kept = list(groups)
+    full_accuracy = cv_accuracy(X, y, sources, sum((groups[g] for g in kept), []), n_folds)
+    dropped = []
+    for group in sorted(groups, key=lambda g: value[g]):
+        if len(kept) == 1:
+            break
+        trial = [g for g in kept if g != group]
+        accuracy = cv_accuracy(X, y, sources, sum((groups[g] for g in trial), []), n_folds)
+        print(f"  without {group:<10} CV accuracy {accuracy:.3f} (full {full_accuracy:.3f})")
+        if accuracy >= full_accuracy - max_accuracy_drop:
+            kept = trial
+            dropped.append(group)
+    return kept, dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build a pruned "fast profile" feature extractor and model')
+    parser.add_argument('--dataset', default='celebrity_dataset', help='Folder with original/ and tampered/ images')
+    parser.add_argument('--models-dir', default='trained_models_fast', help='Where the profile and its model are saved')
+    parser.add_argument('--max-accuracy-drop', type=float, default=0.01, help='Allowed CV accuracy loss')
+    parser.add_argument('--timing-images', type=int, default=10, help='Images used to time feature groups')
+    parser.add_argument('--folds', type=int, default=5, help='Stratified CV folds')
+    parser.add_argument('--holdout', type=float, default=0.25, help='Share of images held out to report the delta')
+
+    args = parser.parse_args()
+
+    # One full feature matrix (cached); every evaluation below slices its columns
+    detector = MLTamperingDetector(args.dataset, feature_store=FeatureStore())
+    X, y, filenames = detector.load_dataset()
+    groups = group_columns()
+    sources = np.array([source_image_name(f) for f in filenames])
+    train_idx, test_idx = next(GroupShuffleSplit(1, test_size=args.holdout, random_state=42).split(X, y, sources))
+    X_train, y_train, sources_train = X[train_idx], y[train_idx], sources[train_idx]
+
+    timing_paths = sorted(glob.glob(os.path.join(detector.original_dir, '*.jpg')) +
+                          glob.glob(os.path.join(detector.tampered_dir, '*.jpg')))
+    timing_paths = timing_paths[::max(len(timing_paths) // args.timing_images, 1)][:args.timing_images]
+
+    print("Timing feature groups...")
+    costs = measure_group_costs(detector, timing_paths)
+    print("Scoring group importance...")
+    importances = group_importances(X_train, y_train, sources_train, groups, args.folds)
+
+    print(f"\n{'group':<12}{'ms/img':>8}{'rf imp':>9}{'perm drop':>11}")
+    for group in groups:
+        rf, drop = importances[group]
+        print(f"{group:<12}{costs[group]:>8.2f}{rf:>9.3f}{drop:>11.3f}")
+
+    print("\nPruning...")
+    kept, dropped = select_profile(X_train, y_train, sources_train, groups, costs, importances,
+                                   args.max_accuracy_drop, args.folds)
+    full_accuracy = holdout_accuracy(X_train, y_train, X[test_idx], y[test_idx], sum(groups.values(), []))
+    profile_accuracy = holdout_accuracy(X_train, y_train, X[test_idx], y[test_idx],
+                                        sum((groups[g] for g in kept), []))
+
+    fast = MLTamperingDetector(args.dataset, feature_store=FeatureStore(), feature_profile=kept)
+    full_latency = measure_extraction_latency(detector, timing_paths)
+    fast_latency = measure_extraction_latency(fast, timing_paths)
+
+    print(f"\nFast profile: {', '.join(kept)}")
+    print(f"Dropped: {', '.join(dropped) or 'nothing'}")
+    print(f"Extraction latency: {full_latency:.1f} ms -> {fast_latency:.1f} ms "
+          f"({(1 - fast_latency / full_latency) * 100:.0f}% saved)")
+    print(f"Held-out ensemble accuracy ({len(test_idx)} images): {full_accuracy:.3f} -> {profile_accuracy:.3f} "
+          f"({profile_accuracy - full_accuracy:+.3f})")
+
+    # Retrained from the cached full vectors; nothing is re-extracted
+    fast.train_models(models_dir=args.models_dir, plots=False)
+    profile = {
+        "feature_profile": kept,
+        "dropped_groups": dropped,
+        "feature_version": fast.feature_version,
+        "group_cost_ms": costs,
+        "group_importance": {g: {"rf": rf, "permutation_drop": drop} for g, (rf, drop) in importances.items()},
+        "latency_ms": {"full": full_latency, "profile": fast_latency},
+        "holdout_accuracy": {"full": full_accuracy, "profile": profile_accuracy,
+                             "delta": profile_accuracy - full_accuracy, "n_images": int(len(test_idx))},
+        "created_at": time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+    with open(os.path.join(args.models_dir, PROFILE_FILENAME), 'w') as f:
+        json.dump(profile, f, indent=2)
+    print(f"\nProfile and model saved to {args.models_dir}/")
+
+if __name__ == "__main__":
+    main()
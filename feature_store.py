@@ -0,0 +1,186 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+# Content-addressed cache of extracted feature vectors. Rows are keyed by the
+# SHA-256 of the image file plus the feature-extractor version, so renamed or
+# copied files hit the cache and edited files miss it. Each version is one
+# append-only float32 matrix on disk, read through a memory map, plus an
+# append-only row log with one digest per line (line i names row i). An
+# append writes only the new rows and their log lines, so ingesting a large
+# corpus batch by batch stays linear; index.json only lists the versions.
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 hex digest of a file's bytes"""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class FeatureStore:
+    def __init__(self, store_dir="feature_store"):
+        self.store_dir = store_dir
+        self.index_path = os.path.join(store_dir, "index.json")
+        self._rows = {}
+        self._counts = {}
+        self._log_sizes = {}
+        self._matrices = {}
+        self.index = self._load_index()
+
+    def _load_index(self):
+        """Load the version list, converting an index from the old all-in-one format"""
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path, 'r') as f:
+            index = json.load(f)
+
+        legacy = [version for version, entry in index.items() if "rows" in entry]
+        for version in legacy:
+            entry = index[version]
+            digests = sorted((row, digest) for digest, row in entry["rows"].items() if row < entry["count"])
+            self._write_rows_log(version, [digest for _, digest in digests])
+            index[version] = {"n_features": entry["n_features"]}
+        if legacy:
+            self.index = index
+            self._save_index()
+        return index
+
+    def _save_index(self):
+        """Write the version list atomically"""
+        os.makedirs(self.store_dir, exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _matrix_path(self, version):
+        return os.path.join(self.store_dir, f"{version}.f32")
+
+    def _rows_path(self, version):
+        return os.path.join(self.store_dir, f"{version}.rows")
+
+    def _write_rows_log(self, version, digests):
+        """Replace a version's row log atomically"""
+        os.makedirs(self.store_dir, exist_ok=True)
+        path = self._rows_path(version)
+        with open(path + ".tmp", 'w') as f:
+            f.writelines(digest + "\n" for digest in digests)
+        os.replace(path + ".tmp", path)
+
+    def _version_rows(self, version):
+        """{digest: row} of a version, read once from its row log"""
+        if version not in self._rows:
+            data = b""
+            if os.path.exists(self._rows_path(version)):
+                with open(self._rows_path(version), 'rb') as f:
+                    data = f.read()
+            # A line without its newline is from an interrupted append; it is overwritten
+            valid = data.rfind(b"\n") + 1
+            digests = data[:valid].decode('ascii').splitlines()
+            rows = {}
+            for row, digest in enumerate(digests):
+                rows.setdefault(digest, row)
+            self._rows[version] = rows
+            self._counts[version] = len(digests)
+            self._log_sizes[version] = valid
+        return self._rows[version]
+
+    def _matrix(self, version):
+        """Read-only memory map of a version's feature matrix"""
+        count = self.count(version)
+        cached = self._matrices.get(version)
+        if cached is None or cached.shape[0] != count:
+            cached = np.memmap(self._matrix_path(version), dtype=np.float32, mode='r',
+                               shape=(count, self.index[version]["n_features"]))
+            self._matrices[version] = cached
+        return cached
+
+    def versions(self):
+        """Return stored extractor versions"""
+        return sorted(self.index.keys())
+
+    def count(self, version):
+        """Number of cached vectors for a version"""
+        if version not in self.index:
+            return 0
+        self._version_rows(version)
+        return self._counts[version]
+
+    def get(self, digest, version):
+        """Cached vector for one digest, or None"""
+        return self.get_many([digest], version)[0]
+
+    def get_many(self, digests, version):
+        """Cached vectors (copies) for many digests; None where missing"""
+        if self.count(version) == 0:
+            return [None] * len(digests)
+
+        rows = self._version_rows(version)
+        matrix = self._matrix(version)
+        return [np.array(matrix[rows[d]]) if d in rows else None for d in digests]
+
+    def put(self, digest, version, vector):
+        """Cache one vector"""
+        self.put_many([digest], version, [vector])
+
+    def put_many(self, digests, version, vectors):
+        """Append vectors for digests not yet cached; costs O(batch), not O(store)"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(digests) == 0:
+            return
+
+        entry = self.index.get(version)
+        if entry is None:
+            entry = self.index[version] = {"n_features": int(vectors.shape[1])}
+            self._save_index()
+        elif entry["n_features"] != vectors.shape[1]:
+            raise ValueError(f"Version '{version}' stores {entry['n_features']} features, got {vectors.shape[1]}")
+
+        rows = self._version_rows(version)
+        count = self._counts[version]
+        new_digests, new_rows = [], []
+        for digest, vector in zip(digests, vectors):
+            if digest not in rows:
+                rows[digest] = count + len(new_rows)
+                new_digests.append(digest)
+                new_rows.append(vector)
+        if not new_rows:
+            return
+
+        # Matrix rows first, then their log lines: a row only counts once it
+        # is logged, and anything past the last logged row gets overwritten
+        os.makedirs(self.store_dir, exist_ok=True)
+        path = self._matrix_path(version)
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+            f.seek(count * entry["n_features"] * 4)
+            f.write(np.ascontiguousarray(new_rows, dtype=np.float32).tobytes())
+            f.truncate()
+
+        log = "".join(digest + "\n" for digest in new_digests).encode('ascii')
+        path = self._rows_path(version)
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+            f.seek(self._log_sizes[version])
+            f.write(log)
+            f.truncate()
+
+        self._counts[version] = count + len(new_rows)
+        self._log_sizes[version] += len(log)
+        self._matrices.pop(version, None)
+
+    def evict(self, keep_versions):
+        """Delete every version not in keep_versions; returns evicted versions"""
+        evicted = [v for v in self.index if v not in keep_versions]
+        for version in evicted:
+            for cache in (self._matrices, self._rows, self._counts, self._log_sizes):
+                cache.pop(version, None)
+            del self.index[version]
+            for path in (self._matrix_path(version), self._rows_path(version)):
+                if os.path.exists(path):
+                    os.remove(path)
+        if evicted:
+            self._save_index()
+        return evicted
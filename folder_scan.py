@@ -9,6 +9,7 @@ import sys
 import time
 from pathlib import Path
 from analyze_single_image import SingleImageTamperingDetector
+from metadata_analysis import triage_files
 
 class FolderScanner:
     def __init__(self):
@@ -96,6 +97,36 @@ class FolderScanner:
         # Show summary
         self.show_summary(tampered_count, suspicious_count, clean_count, len(images))
     
+    def triage_folder(self, folder_path, check_thumbnails=False):
+        """Metadata-only scan: rank files for full analysis without decoding pixels"""
+        print(f"📂 Metadata triage: {folder_path}")
+        print("="*60)
+        
+        images = self.find_images(folder_path)
+        if not images:
+            print("❌ No supported images found!")
+            return []
+        
+        start_time = time.time()
+        ranked = triage_files([str(p) for p in images], check_thumbnails=check_thumbnails)
+        elapsed = time.time() - start_time
+        
+        print(f"🔍 Triaged {len(ranked)} images in {elapsed:.2f}s ({len(ranked) / max(elapsed, 1e-6):.0f} files/s)")
+        print("-" * 60)
+        print("📋 Priority list for full analysis:")
+        for i, entry in enumerate(ranked, 1):
+            reasons = ", ".join(entry['reasons']) or "metadata looks intact"
+            print(f"  {i:3d}. [{entry['triage_score']:3d}] {Path(entry['path']).name} - {reasons}")
+        
+        self.results_summary = [{
+            'file': Path(entry['path']).name,
+            'path': entry['path'],
+            'confidence': entry['triage_score'] / 100.0,
+            'status': "📋 TRIAGE",
+            'likely_tampered': entry['triage_score'] >= 50
+        } for entry in ranked]
+        return ranked
+    
     def show_summary(self, tampered, suspicious, clean, total):
         """Display scan summary"""
         print("\n" + "="*60)
@@ -162,14 +193,18 @@ class FolderScanner:
 def main():
     print("📂 FOLDER SCAN - Batch Image Tampering Detection")
     print("Scan entire folders for tampered images!")
+    print("Usage: python folder_scan.py <folder> [--triage [--thumbnails]]")
     print("-" * 60)
     
     scanner = FolderScanner()
     
     if len(sys.argv) > 1:
-        # Command line usage
+        # Command line usage (--triage: metadata only, no pixel analysis)
         folder_path = sys.argv[1]
-        scanner.scan_folder(folder_path)
+        if '--triage' in sys.argv[2:]:
+            scanner.triage_folder(folder_path, check_thumbnails='--thumbnails' in sys.argv[2:])
+        else:
+            scanner.scan_folder(folder_path)
         
         # Ask if user wants to save report
         save_report = input("\n💾 Save detailed report? (y/n): ").lower().strip()
@@ -0,0 +1,119 @@
+import os
+import numpy as np
+
+# NumPy-only inference for a trained RandomForestClassifier (plus the
+# StandardScaler in front of it). Every tree is flattened into shared node
+# arrays and all samples walk all trees together with fancy indexing, one
+# tree level per step. The arithmetic mirrors sklearn exactly (float32
+# feature comparisons, per-tree probabilities summed in estimator order), so
+# the probabilities are bit-identical while sklearn never has to be imported.
+
+COMPACT_FOREST_FILENAME = "rf_compact.npz"
+
+
+class CompactForest:
+    def __init__(self, arrays):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.missing_left = arrays["missing_left"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.classes_ = arrays["classes"]
+        self.scaler_mean = arrays["scaler_mean"]
+        self.scaler_scale = arrays["scaler_scale"]
+        self.feature_version = str(arrays["feature_version"])
+        self.max_depth = int(arrays["max_depth"])
+        # Bundle saved together with this export ("" or absent: unknown)
+        self.bundle_id = str(arrays.get("bundle_id", "")) or None
+
+    @classmethod
+    def from_sklearn(cls, rf_model, scaler, feature_version, bundle_id=None):
+        """Flatten a fitted forest and scaler into contiguous arrays"""
+        feature, threshold, left, right, missing_left, value, roots = [], [], [], [], [], [], []
+        offset = 0
+        n_classes = len(rf_model.classes_)
+        for estimator in rf_model.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == -1
+            roots.append(offset)
+            # Leaves point at themselves so the walk can run a fixed number of steps
+            own = np.arange(offset, offset + tree.node_count)
+            left.append(np.where(is_leaf, own, tree.children_left + offset))
+            right.append(np.where(is_leaf, own, tree.children_right + offset))
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            missing = getattr(tree, "missing_go_to_left", None)
+            missing_left.append(np.zeros(tree.node_count, bool) if missing is None else missing.astype(bool))
+
+            # Older sklearn stores class counts and normalizes in predict_proba
+            leaf_value = tree.value[:, 0, :n_classes].astype(np.float64)
+            normalizer = leaf_value.sum(axis=1)
+            if not np.allclose(normalizer[is_leaf], 1.0):
+                normalizer[normalizer == 0.0] = 1.0
+                leaf_value /= normalizer[:, np.newaxis]
+            value.append(leaf_value)
+            offset += tree.node_count
+
+        return cls({
+            "feature": np.concatenate(feature).astype(np.intp),
+            "threshold": np.concatenate(threshold).astype(np.float64),
+            "left": np.concatenate(left).astype(np.intp),
+            "right": np.concatenate(right).astype(np.intp),
+            "missing_left": np.concatenate(missing_left),
+            "value": np.concatenate(value),
+            "roots": np.asarray(roots, dtype=np.intp),
+            "classes": np.asarray(rf_model.classes_),
+            "scaler_mean": np.asarray(scaler.mean_, dtype=np.float64),
+            "scaler_scale": np.asarray(scaler.scale_, dtype=np.float64),
+            "feature_version": np.asarray(feature_version),
+            "max_depth": np.asarray(max(e.tree_.max_depth for e in rf_model.estimators_)),
+            "bundle_id": np.asarray(bundle_id or "")
+        })
+
+    def save(self, path):
+        """Write the arrays to an .npz file atomically"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, feature=self.feature, threshold=self.threshold, left=self.left,
+                 right=self.right, missing_left=self.missing_left, value=self.value,
+                 roots=self.roots, classes=self.classes_, scaler_mean=self.scaler_mean,
+                 scaler_scale=self.scaler_scale, feature_version=np.asarray(self.feature_version),
+                 max_depth=np.asarray(self.max_depth), bundle_id=np.asarray(self.bundle_id or ""))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls({key: data[key] for key in data.files})
+
+    def transform(self, features):
+        """StandardScaler.transform with the same in-place arithmetic"""
+        X = np.array(features, dtype=np.float32 if np.asarray(features).dtype == np.float32 else np.float64)
+        X -= self.scaler_mean.astype(X.dtype)
+        X /= self.scaler_scale.astype(X.dtype)
+        return X
+
+    def predict_proba_scaled(self, X_scaled):
+        """Class probabilities for already-scaled features, shape (n_samples, n_classes)"""
+        # sklearn trees compare float32 features against float64 thresholds
+        X = np.ascontiguousarray(X_scaled, dtype=np.float32)
+        rows = np.arange(X.shape[0])[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots)))
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[nodes]]
+            go_left = (x <= self.threshold[nodes]) | (np.isnan(x) & self.missing_left[nodes])
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        # Accumulate tree by tree, in order, exactly as the forest does
+        leaf_values = self.value[nodes]
+        proba = np.zeros((X.shape[0], leaf_values.shape[2]), dtype=np.float64)
+        for t in range(leaf_values.shape[1]):
+            proba += leaf_values[:, t]
+        proba /= len(self.roots)
+        return proba
+
+    def predict_proba(self, features):
+        """Class probabilities for raw (unscaled) feature vectors"""
+        return self.predict_proba_scaled(self.transform(features))
@@ -0,0 +1,151 @@
+import numpy as np
+from functools import lru_cache
+from scipy import fft as sp_fft
+
+# Spectrum analysis shared by the ML features and the GAN fingerprint check.
+# Everything works on the half-spectrum from rfft2 of float32 input; the
+# Hermitian symmetry of a real image's FFT is folded into cached weight maps
+# so results match the full fftshift-ed spectrum.
+
+SPECTRUM_BINS = 64
+
+
+def _dct_matrix(n=8):
+    """Orthonormal DCT-II basis (same convention as cv2.dct)"""
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    basis = np.cos(np.pi * (2 * x + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    basis[0] /= np.sqrt(2.0)
+    return basis.astype(np.float32)
+
+
+DCT8 = _dct_matrix(8)
+
+
+def block_dct(gray, block_size=8):
+    """DCT of every full block at once; returns (..., rows, cols, block, block)
+
+    Leading axes are treated as a batch, so (N, H, W) stacks work too.
+    """
+    basis = DCT8 if block_size == 8 else _dct_matrix(block_size)
+    gray = np.asarray(gray)
+    lead = gray.shape[:-2]
+    h, w = gray.shape[-2:]
+    rows, cols = h // block_size, w // block_size
+    blocks = gray[..., :rows * block_size, :cols * block_size].astype(np.float32)
+    blocks = blocks.reshape(lead + (rows, block_size, cols, block_size)).swapaxes(-3, -2)
+    return basis @ blocks @ basis.T
+
+
+@lru_cache(maxsize=16)
+def _hermitian_weights(h, w):
+    """Column weights that expand a rfft2 half-spectrum to the full spectrum"""
+    weights = np.full(w // 2 + 1, 2.0, np.float32)
+    weights[0] = 1.0
+    if w % 2 == 0:
+        weights[-1] = 1.0
+    return weights
+
+
+@lru_cache(maxsize=16)
+def _band_weights(h, w):
+    """Half-spectrum weights equal to the centered low-frequency box mask"""
+    # Box used by the original full-spectrum features (after fftshift)
+    center_h, center_w = h // 2, w // 2
+    shifted = np.zeros((h, w), np.float32)
+    shifted[center_h - h // 4:center_h + h // 4, center_w - w // 4:center_w + w // 4] = 1
+    full = np.fft.ifftshift(shifted)
+
+    # Fold the mirrored half onto the rfft2 layout
+    cols = w // 2 + 1
+    low = full[:, :cols].copy()
+    mirror = full[(-np.arange(h)) % h][:, (-np.arange(cols)) % w]
+    interior = np.ones(cols, bool)
+    interior[0] = False
+    if w % 2 == 0:
+        interior[-1] = False
+    low[:, interior] += mirror[:, interior]
+    return low
+
+
+@lru_cache(maxsize=16)
+def _radial_bins(h, w, n_bins):
+    """Radial bin index map, Hermitian weights and bin counts for one image shape"""
+    fy = np.fft.fftfreq(h).astype(np.float32)[:, None]
+    fx = np.fft.rfftfreq(w).astype(np.float32)[None, :]
+    radius = np.sqrt(fy ** 2 + fx ** 2)
+
+    # Corners beyond the Nyquist circle go to an overflow bin that is dropped
+    index = np.minimum((radius / 0.5 * n_bins).astype(np.int32), n_bins).ravel()
+    weights = np.broadcast_to(_hermitian_weights(h, w), (h, w // 2 + 1)).ravel()
+    counts = np.bincount(index, weights=weights, minlength=n_bins + 1)[:n_bins]
+    return index, weights, np.maximum(counts, 1)
+
+
+def _magnitude(gray):
+    """Half-spectrum magnitude of a 2-D image in float32"""
+    spectrum = sp_fft.rfft2(np.asarray(gray, dtype=np.float32))
+    return np.abs(spectrum)
+
+
+def frequency_band_energies(gray, magnitude=None):
+    """Return (high_freq_energy, low_freq_energy) of the magnitude spectrum"""
+    h, w = gray.shape[:2]
+    if magnitude is None:
+        magnitude = _magnitude(gray)
+
+    total = float(np.dot(magnitude.sum(axis=0, dtype=np.float64), _hermitian_weights(h, w)))
+    low = float(np.sum(magnitude * _band_weights(h, w), dtype=np.float64))
+    return total - low, low
+
+
+def azimuthal_power_spectrum(gray, n_bins=SPECTRUM_BINS, magnitude=None):
+    """Mean log10 power per radial frequency bin (DC to Nyquist)"""
+    h, w = gray.shape[:2]
+    if magnitude is None:
+        magnitude = _magnitude(gray)
+
+    index, weights, counts = _radial_bins(h, w, n_bins)
+    power = (magnitude.astype(np.float64) ** 2).ravel()
+    sums = np.bincount(index, weights=power * weights, minlength=n_bins + 1)[:n_bins]
+    return np.log10(sums / counts + 1e-12)
+
+
+def upsampling_artifact_score(spectrum):
+    """Score 0-1 for how far the high band departs from a natural power law"""
+    n_bins = len(spectrum)
+    freqs = (np.arange(n_bins) + 0.5) / n_bins * 0.5
+
+    # Natural images follow a power law; fit it on the mid band
+    mid = (freqs > 0.05) & (freqs <= 0.25)
+    high = freqs > 0.25
+    slope, intercept = np.polyfit(np.log10(freqs[mid]), spectrum[mid], 1)
+    residual = spectrum[high] - (slope * np.log10(freqs[high]) + intercept)
+
+    # Upsampling layers leave peaks or a missing tail around the extrapolated law
+    deviation = float(np.mean(np.abs(residual)))
+    return float(np.clip(deviation, 0.0, 1.0))
+
+
+def analyze_gan_spectrum(gray, n_bins=SPECTRUM_BINS):
+    """Extract spectral fingerprint features for GAN / deepfake detection"""
+    magnitude = _magnitude(gray)
+    spectrum = azimuthal_power_spectrum(gray, n_bins, magnitude=magnitude)
+    high_energy, low_energy = frequency_band_energies(gray, magnitude=magnitude)
+
+    freqs = (np.arange(n_bins) + 0.5) / n_bins * 0.5
+    band = freqs > 0.05
+    slope = np.polyfit(np.log10(freqs[band]), spectrum[band], 1)[0]
+    linear_power = 10.0 ** spectrum
+    tail_ratio = np.sum(linear_power[freqs > 0.375]) / max(np.sum(linear_power), 1e-12)
+
+    return {
+        "azimuthal_spectrum": spectrum,
+        "features": {
+            "spectrum_slope": float(slope),
+            "spectrum_tail_ratio": float(tail_ratio),
+            "frequency_high_energy": high_energy,
+            "frequency_low_energy": low_energy
+        },
+        "upsampling_score": upsampling_artifact_score(spectrum)
+    }
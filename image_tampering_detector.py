@@ -6,12 +6,15 @@ import os
 import json
 from scipy import ndimage
 from sklearn.cluster import KMeans
+from noise_estimation import estimate_noise, find_noise_outliers
+from face_analysis import FaceROIAnalyzer, detect_faces, blending_scores
 import warnings
 warnings.filterwarnings('ignore')
 
 class ImageTamperingDetector:
-    def __init__(self):
+    def __init__(self, prnu_store=None):
         self.results = {}
+        self.prnu_store = prnu_store  # Optional PRNUFingerprintStore of known cameras
         
     def load_image(self, image_path):
         """Load image using multiple methods for robustness"""
@@ -70,33 +73,13 @@ class ImageTamperingDetector:
         else:
             gray = image.copy()
         
-        # Apply high-pass filter to extract noise
-        kernel = np.array([[-1, -1, -1], [-1, 8, -1], [-1, -1, -1]])
-        noise = cv2.filter2D(gray, -1, kernel)
-        
-        # Divide image into blocks and analyze noise variance
+        # Per-block noise sigma from the wavelet HH subband (MAD estimate)
         block_size = 32
-        height, width = gray.shape
-        variances = []
-        positions = []
-        
-        for i in range(0, height - block_size, block_size):
-            for j in range(0, width - block_size, block_size):
-                block_noise = noise[i:i+block_size, j:j+block_size]
-                var = np.var(block_noise)
-                variances.append(var)
-                positions.append((i, j))
-        
-        if len(variances) > 0:
-            variances = np.array(variances)
-            mean_var = np.mean(variances)
-            std_var = np.std(variances)
-            
+        sigma, noise_map = estimate_noise(gray, tile_size=block_size)
+        
+        if noise_map.size > 0:
             # Find outliers (potential tampered regions)
-            outliers = []
-            for i, var in enumerate(variances):
-                if abs(var - mean_var) > 2 * std_var:
-                    outliers.append((positions[i], var))
+            outliers = find_noise_outliers(noise_map, tile_size=block_size)
             
             confidence = min(len(outliers) * 0.05, 1.0) if outliers else 0.0
             return outliers, confidence
@@ -208,7 +191,80 @@ class ImageTamperingDetector:
         
         confidence = min(len(suspicious_edges) * 0.1, 1.0)
         return suspicious_edges, confidence
+
+    def detect_face_blending(self, image, faces=None):
+        """Detect blending seams around face boundaries (face swaps)"""
+        if len(image.shape) != 3:
+            return [], 0.0
+        
+        if faces is None:
+            faces = detect_faces(image)
+        if len(faces) == 0:
+            return [], 0.0
+        
+        # Compare gradient, noise and colour inside, on and outside an elliptical ring
+        suspicious_faces = [f for f in blending_scores(image, faces) if f["blending_score"] > 0.4]
+        
+        confidence = max([f["blending_score"] for f in suspicious_faces], default=0.0)
+        return suspicious_faces, confidence
     
+    def detect_cfa_artifacts(self, image, tile_size=32):
+        """Detect tiles missing the camera's CFA demosaicing periodicity"""
+        if len(image.shape) != 3:
+            return [], 0.0
+
+        # Green is sampled on a quincunx grid, so interpolated green pixels
+        # are well predicted by their 4 neighbours and the error shows a
+        # 2x2 (checkerboard) period. Splices and resampling destroy it.
+        green = image[:, :, 1]
+        height, width = green.shape
+        rows = (height - 2) // tile_size
+        cols = (width - 2) // tile_size
+        if rows == 0 or cols == 0:
+            return [], 0.0
+
+        half = tile_size // 2
+        n_bins = tile_size * (half + 1)
+        scores = np.zeros((rows, cols), np.float32)
+        energies = np.zeros((rows, cols), np.float32)
+
+        # Single streaming pass: one strip of tiles (plus a 1-pixel halo) at a time
+        for r in range(rows):
+            y0 = 1 + r * tile_size
+            strip = green[y0 - 1:y0 + tile_size + 1, :cols * tile_size + 2].astype(np.float32)
+            error = strip[1:-1, 1:-1] - 0.25 * (strip[:-2, 1:-1] + strip[2:, 1:-1] +
+                                                strip[1:-1, :-2] + strip[1:-1, 2:])
+            tiles = np.abs(error).reshape(tile_size, cols, tile_size).transpose(1, 0, 2)
+
+            # Batched small FFT: the (N/2, N/2) bin is the checkerboard component
+            spectrum = np.fft.rfft2(tiles)
+            magnitude = np.abs(spectrum)
+            peak = spectrum[:, half, half].real
+            background = (magnitude.sum(axis=(1, 2)) - magnitude[:, 0, 0] - np.abs(peak)) / (n_bins - 2)
+            scores[r] = peak / (background + 1e-6)
+            energies[r] = magnitude[:, 0, 0] / (tile_size * tile_size)
+
+        # Flat tiles carry no usable interpolation trace
+        textured = energies > 0.25
+        if np.sum(textured) < 4:
+            return [], 0.0
+
+        dominant = np.median(scores[textured])
+        if abs(dominant) < 2.0:
+            # No global CFA trace (resampled, heavily compressed or synthetic)
+            return [], 0.0
+
+        # Tiles whose periodicity is missing or has the wrong phase
+        aligned = scores * np.sign(dominant)
+        flagged = textured & (aligned < 0.25 * abs(dominant))
+
+        suspicious_tiles = []
+        for r, c in zip(*np.nonzero(flagged)):
+            suspicious_tiles.append((int(1 + r * tile_size), int(1 + c * tile_size), float(aligned[r, c])))
+
+        confidence = min(len(suspicious_tiles) / float(np.sum(textured)) * 5.0, 1.0)
+        return suspicious_tiles, confidence
+
     def analyze_image(self, image_path):
         """Main analysis function"""
         print(f"Analyzing image: {image_path}")
@@ -240,6 +296,19 @@ class ImageTamperingDetector:
             "details": noise_outliers[:5]
         }
         
+        confidences = []
+        if self.prnu_store is not None and self.prnu_store.list_devices():
+            print("Matching sensor noise (PRNU) fingerprints...")
+            prnu = self.prnu_store.analyze_image(image)
+            results["analysis"]["prnu"] = {
+                "device": prnu["device"],
+                "device_scores": prnu["scores"],
+                "missing_tiles": len(prnu["missing_tiles"]),
+                "confidence": prnu["confidence"],
+                "details": prnu["missing_tiles"][:5]
+            }
+            confidences.append(prnu["confidence"])
+        
         print("Detecting JPEG artifacts...")
         jpeg_artifacts, jpeg_confidence = self.detect_jpeg_compression_artifacts(image)
         results["analysis"]["jpeg_artifacts"] = {
@@ -264,9 +333,17 @@ class ImageTamperingDetector:
             "details": edge_artifacts[:5]
         }
         
+        print("Analyzing CFA demosaicing artifacts...")
+        cfa_tiles, cfa_confidence = self.detect_cfa_artifacts(image)
+        results["analysis"]["cfa_artifacts"] = {
+            "inconsistent_tiles": len(cfa_tiles),
+            "confidence": cfa_confidence,
+            "details": cfa_tiles[:5]
+        }
+        
         # Calculate overall tampering confidence
-        confidences = [cm_confidence, noise_confidence, jpeg_confidence, 
-                      lighting_confidence, edge_confidence]
+        confidences += [cm_confidence, noise_confidence, jpeg_confidence, 
+                        lighting_confidence, edge_confidence, cfa_confidence]
         overall_confidence = np.mean(confidences)
         
         results["overall_assessment"] = {
@@ -277,6 +354,28 @@ class ImageTamperingDetector:
         
         return results
     
+    def analyze_faces(self, image_path, margin=0.25):
+        """Face-ROI mode: run the forensic metrics on face crops only"""
+        print(f"Analyzing face regions: {image_path}")
+        
+        image = self.load_image(image_path)
+        if image is None:
+            return {"error": "Could not load image"}
+        
+        face_results = FaceROIAnalyzer(margin=margin).analyze(image)
+        
+        return {
+            "image_path": image_path,
+            "image_shape": image.shape,
+            "faces_detected": len(face_results["faces"]),
+            "face_analysis": face_results,
+            "overall_assessment": {
+                "tampering_confidence": face_results["confidence"],
+                "likely_tampered": face_results["confidence"] > 0.5,
+                "severity": "High" if face_results["confidence"] > 0.7 else "Medium" if face_results["confidence"] > 0.5 else "Low"
+            }
+        }
+    
     def visualize_results(self, image_path, results):
         """Create visualization of detected tampering"""
         image = self.load_image(image_path)
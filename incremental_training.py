@@ -0,0 +1,191 @@
+import os
+import time
+import argparse
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+from ml_tampering_detector import MLTamperingDetector
+from feature_store import FeatureStore
+from model_bundle import ModelBundle, save_bundle
+
+# Out-of-core training for corpora that do not fit in memory. Features are
+# streamed in fixed-size batches (read from the feature store, extracted and
+# cached on a miss), the scaler is updated with partial_fit and a logistic
+# SGD classifier learns batch by batch, so memory is bounded by one batch.
+# The state is checkpointed every few batches: an interrupted run resumes
+# where it stopped, and new labelled images update the checkpointed model
+# instead of retraining from scratch. publish() writes the model as a regular
+# detector bundle (model_type "linear") for MLTamperingDetector.load_models
+# and ModelManager.
+
+CHECKPOINT_FILENAME = "incremental_model.joblib"
+CLASSES = np.array([0, 1])
+
+
+def dataset_samples(detector):
+    """[(path, label)] for the detector's dataset folders"""
+    samples = []
+    for label, folder in ((0, detector.original_dir), (1, detector.tampered_dir)):
+        if os.path.isdir(folder):
+            samples.extend((os.path.join(folder, f), label) for f in sorted(os.listdir(folder)) if f.endswith('.jpg'))
+    return samples
+
+
+def feature_batches(detector, samples, batch_size=1024, epochs=1, seed=42, skip=0, n_workers=None):
+    """Yield (X, y) batches over shuffled samples; the first `skip` batches are not extracted
+
+    Every batch is yielded, even one whose images all failed (X and y then
+    have no rows), so a consumer's batch count lines up with `skip`.
+    """
+    rng = np.random.RandomState(seed)
+    batch_index = 0
+    for _ in range(epochs):
+        order = rng.permutation(len(samples))
+        for start in range(0, len(order), batch_size):
+            batch_index += 1
+            if batch_index <= skip:
+                continue
+            batch = [samples[i] for i in order[start:start + batch_size]]
+            vectors = detector._features_for_paths([path for path, _ in batch], n_workers,
+                                                   progress_callback=lambda done, total: None)
+            keep = [i for i, vector in enumerate(vectors) if vector is not None]
+            yield (np.array([vectors[i] for i in keep], dtype=np.float64),
+                   np.array([batch[i][1] for i in keep]))
+
+
+class IncrementalTrainer:
+    def __init__(self, feature_version, models_dir="trained_models", checkpoint_every=10):
+        self.feature_version = feature_version
+        self.checkpoint_path = os.path.join(models_dir, CHECKPOINT_FILENAME)
+        self.checkpoint_every = checkpoint_every
+
+        self.scaler = StandardScaler()
+        self.model = SGDClassifier(loss='log_loss', alpha=1e-4, random_state=42)
+        self.state = {"n_samples_seen": 0, "n_batches": 0, "run": None}
+
+    def load_checkpoint(self):
+        """Restore scaler, model and progress; returns False if there is no checkpoint"""
+        if not os.path.exists(self.checkpoint_path):
+            return False
+        # Plain load: partial_fit writes to the model arrays
+        bundle = ModelBundle(self.checkpoint_path, mmap_mode=None)
+        if bundle.metadata.get("feature_version") != self.feature_version:
+            raise ValueError(f"Checkpoint {self.checkpoint_path} was trained on features "
+                             f"{bundle.metadata.get('feature_version')}, detector extracts {self.feature_version}")
+        self.scaler = bundle.get("scaler")
+        self.model = bundle.get("model")
+        self.state = {key: bundle.metadata[key] for key in ("n_samples_seen", "n_batches", "run")}
+        return True
+
+    def save_checkpoint(self):
+        save_bundle(self.checkpoint_path, {"scaler": self.scaler, "model": self.model},
+                    dict(self.state, feature_version=self.feature_version))
+
+    def fit_batch(self, X, y):
+        """Update scaler and model with one batch; returns accuracy on it before the update"""
+        accuracy = None
+        if self.state["n_batches"] > 0:
+            # Progressive validation: each batch is scored before it is learned
+            accuracy = float(np.mean(self.model.predict(self.scaler.transform(X)) == y))
+        self.scaler.partial_fit(X)
+        self.model.partial_fit(self.scaler.transform(X), y, classes=CLASSES)
+        self.state["n_samples_seen"] += len(X)
+        self.state["n_batches"] += 1
+        return accuracy
+
+    def fit_batches(self, batches, run=None):
+        """Train on an iterable of (X, y), checkpointing every checkpoint_every batches
+
+        run: progress dict stored in the checkpoint ({"batches_done": int, ...})
+        so an interrupted run can skip what it already learned.
+        """
+        run = dict(run or {}, batches_done=(run or {}).get("batches_done", 0), complete=False)
+        self.state["run"] = run
+        correct, scored = 0.0, 0
+        for X, y in batches:
+            # Empty batches are still counted: resuming skips by position
+            accuracy = self.fit_batch(X, y) if len(y) else None
+            if accuracy is not None:
+                correct += accuracy * len(y)
+                scored += len(y)
+            run["batches_done"] += 1
+            if run["batches_done"] % self.checkpoint_every == 0:
+                self.save_checkpoint()
+                print(f"Checkpoint after {run['batches_done']} batches "
+                      f"({self.state['n_samples_seen']} samples seen)")
+
+        run["complete"] = True
+        self.save_checkpoint()
+        return correct / scored if scored else None
+
+    def publish(self, detector, models_dir="trained_models"):
+        """Save the model as the detector's bundle in models_dir, replacing the ensemble served there"""
+        if detector.feature_version != self.feature_version:
+            raise ValueError(f"Trainer learned features {self.feature_version}, detector extracts {detector.feature_version}")
+        detector.model_type = "linear"
+        detector.scaler = self.scaler
+        detector.linear_model = self.model
+        detector.training_info = {
+            "trained_at": time.strftime('%Y-%m-%d %H:%M:%S'),
+            "n_samples": int(self.state["n_samples_seen"]),
+            "n_batches": int(self.state["n_batches"])
+        }
+        detector.save_models(models_dir)
+
+    def predict_proba(self, features):
+        """Class probabilities for raw feature vectors"""
+        return self.model.predict_proba(self.scaler.transform(np.asarray(features, dtype=np.float64)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Incremental (out-of-core) training on streamed feature batches')
+    parser.add_argument('--dataset', default='celebrity_dataset', help='Folder with original/ and tampered/ images')
+    parser.add_argument('--models-dir', default='trained_models', help='Where the checkpoint is kept')
+    parser.add_argument('--batch-size', type=int, default=1024, help='Images per batch')
+    parser.add_argument('--epochs', type=int, default=1, help='Passes over the dataset')
+    parser.add_argument('--checkpoint-every', type=int, default=10, help='Batches between checkpoints')
+    parser.add_argument('--workers', type=int, help='Feature extraction processes for cache misses')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--resume', action='store_true', help='Continue an interrupted run on the same dataset')
+    mode.add_argument('--update', action='store_true', help='Start from the checkpointed model and learn the given dataset')
+    parser.add_argument('--publish', action='store_true',
+                        help='Also save the model as the detector bundle in --models-dir (replaces the served ensemble)')
+
+    args = parser.parse_args()
+
+    detector = MLTamperingDetector(args.dataset, feature_store=FeatureStore())
+    trainer = IncrementalTrainer(detector.feature_version, args.models_dir, args.checkpoint_every)
+    samples = dataset_samples(detector)
+    run = {"dataset": args.dataset, "n_images": len(samples), "batch_size": args.batch_size,
+           "epochs": args.epochs, "seed": 42, "batches_done": 0}
+
+    if args.resume or args.update:
+        if not trainer.load_checkpoint():
+            print(f"No checkpoint found at {trainer.checkpoint_path}")
+            return
+    if args.resume:
+        previous = trainer.state["run"] or {}
+        if previous.get("complete"):
+            print("Last run already completed; use --update to learn new data")
+            return
+        if any(previous.get(key) != run[key] for key in ("dataset", "n_images", "batch_size", "epochs")):
+            print("Checkpointed run used a different dataset or batch settings; cannot resume")
+            return
+        run["batches_done"] = previous.get("batches_done", 0)
+        print(f"Resuming after batch {run['batches_done']}")
+
+    print(f"Streaming {len(samples)} images in batches of {args.batch_size} for {args.epochs} epoch(s)...")
+    start = time.time()
+    batches = feature_batches(detector, samples, args.batch_size, args.epochs, run["seed"],
+                              skip=run["batches_done"], n_workers=args.workers)
+    accuracy = trainer.fit_batches(batches, run)
+
+    print(f"Trained in {time.time() - start:.1f} seconds; {trainer.state['n_samples_seen']} samples seen in total")
+    if accuracy is not None:
+        print(f"Progressive validation accuracy (this run): {accuracy:.3f}")
+    print(f"Model saved to {trainer.checkpoint_path}")
+    if args.publish:
+        trainer.publish(detector, args.models_dir)
+
+if __name__ == "__main__":
+    main()
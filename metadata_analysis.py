@@ -0,0 +1,318 @@
+import io
+import struct
+import cv2
+import numpy as np
+from PIL import Image, IptcImagePlugin, JpegImagePlugin
+
+# Cheap metadata checks that never decode the full-resolution image.
+
+JPEG_THUMBNAIL_OFFSET = 0x0201
+JPEG_THUMBNAIL_LENGTH = 0x0202
+
+
+def _open_source(source):
+    """Return a binary file object for a path, bytes or file-like source"""
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source), True
+    if isinstance(source, str):
+        return open(source, 'rb'), True
+    source.seek(0)
+    return source, False
+
+
+def _read_exif_segment(f):
+    """Return the TIFF payload of the JPEG APP1 Exif segment, or None"""
+    if f.read(2) != b'\xff\xd8':
+        return None
+
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        if marker[1] in (0xDA, 0xD9):
+            # Start of scan: no more metadata segments
+            return None
+        length = struct.unpack('>H', f.read(2))[0]
+        if marker[1] == 0xE1:
+            payload = f.read(length - 2)
+            if payload[:6] == b'Exif\x00\x00':
+                return payload[6:]
+        else:
+            f.seek(length - 2, io.SEEK_CUR)
+
+
+def _thumbnail_from_tiff(tiff):
+    """Extract the IFD1 JPEG thumbnail bytes from an Exif TIFF block"""
+    if tiff[:2] == b'II':
+        endian = '<'
+    elif tiff[:2] == b'MM':
+        endian = '>'
+    else:
+        return None
+
+    try:
+        ifd0 = struct.unpack(endian + 'I', tiff[4:8])[0]
+        count = struct.unpack(endian + 'H', tiff[ifd0:ifd0 + 2])[0]
+        ifd1 = struct.unpack(endian + 'I', tiff[ifd0 + 2 + 12 * count:ifd0 + 6 + 12 * count])[0]
+        if ifd1 == 0:
+            return None
+
+        offset = length = None
+        count = struct.unpack(endian + 'H', tiff[ifd1:ifd1 + 2])[0]
+        for i in range(count):
+            entry = tiff[ifd1 + 2 + 12 * i:ifd1 + 14 + 12 * i]
+            tag, field_type = struct.unpack(endian + 'HH', entry[:4])
+            value_format = 'H' if field_type == 3 else 'I'
+            value = struct.unpack(endian + value_format, entry[8:8 + struct.calcsize(value_format)])[0]
+            if tag == JPEG_THUMBNAIL_OFFSET:
+                offset = value
+            elif tag == JPEG_THUMBNAIL_LENGTH:
+                length = value
+    except struct.error:
+        return None
+
+    if offset is None or not length:
+        return None
+    thumbnail = tiff[offset:offset + length]
+    return thumbnail if thumbnail[:2] == b'\xff\xd8' else None
+
+
+def read_exif_thumbnail(source):
+    """Return the embedded EXIF thumbnail JPEG bytes (header parsing only)"""
+    f, owned = _open_source(source)
+    try:
+        tiff = _read_exif_segment(f)
+    except (OSError, struct.error):
+        tiff = None
+    finally:
+        if owned:
+            f.close()
+    return _thumbnail_from_tiff(tiff) if tiff else None
+
+
+def _trim_padding(gray, threshold=8):
+    """Remove letterbox bars that cameras add to fixed-size thumbnails"""
+    rows = np.nonzero(gray.max(axis=1) > threshold)[0]
+    cols = np.nonzero(gray.max(axis=0) > threshold)[0]
+    if len(rows) == 0 or len(cols) == 0:
+        return gray
+    return gray[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+
+
+def perceptual_hash(gray):
+    """64-bit DCT perceptual hash as a boolean array"""
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].ravel()
+    return low > np.median(low[1:])
+
+
+def structural_similarity(a, b):
+    """Mean SSIM of two equally sized grayscale images"""
+    a = a.astype(np.float32)
+    b = b.astype(np.float32)
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+
+    def blur(x):
+        return cv2.GaussianBlur(x, (7, 7), 1.5)
+
+    mu_a, mu_b = blur(a), blur(b)
+    var_a = blur(a * a) - mu_a ** 2
+    var_b = blur(b * b) - mu_b ** 2
+    cov = blur(a * b) - mu_a * mu_b
+    ssim_map = ((2 * mu_a * mu_b + c1) * (2 * cov + c2)) / ((mu_a ** 2 + mu_b ** 2 + c1) * (var_a + var_b + c2))
+    return float(ssim_map.mean())
+
+
+def check_thumbnail_consistency(source, phash_threshold=12, ssim_threshold=0.75):
+    """Compare the EXIF thumbnail with a reduced-resolution decode of the image"""
+    result = {
+        "has_thumbnail": False,
+        "phash_distance": None,
+        "ssim": None,
+        "consistent": None,
+        "confidence": 0.0
+    }
+
+    thumb_bytes = read_exif_thumbnail(source)
+    if thumb_bytes is None:
+        return result
+
+    thumb = cv2.imdecode(np.frombuffer(thumb_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+    if thumb is None:
+        return result
+    thumb = _trim_padding(thumb)
+    result["has_thumbnail"] = True
+
+    # JPEG DCT scaling decodes the main image at 1/2..1/8 resolution
+    f, owned = _open_source(source)
+    try:
+        img = Image.open(f)
+        img.draft('L', (thumb.shape[1] * 2, thumb.shape[0] * 2))
+        main = np.array(img.convert('L'))
+    except (OSError, Image.DecompressionBombError, ValueError) as e:
+        # Truncated or corrupt main image behind an intact thumbnail
+        result["error"] = f"could not decode main image: {e}"
+        return result
+    finally:
+        if owned:
+            f.close()
+
+    main = cv2.resize(main, (thumb.shape[1], thumb.shape[0]), interpolation=cv2.INTER_AREA)
+
+    distance = int(np.count_nonzero(perceptual_hash(main) != perceptual_hash(thumb)))
+    ssim = structural_similarity(main, thumb)
+    consistent = distance <= phash_threshold and ssim >= ssim_threshold
+
+    result.update({
+        "phash_distance": distance,
+        "ssim": round(ssim, 4),
+        "consistent": consistent,
+        "confidence": 0.0 if consistent else min(0.5 + distance / 64.0 + max(0.0, ssim_threshold - ssim), 1.0)
+    })
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Metadata-only triage for folder scans. Files are opened lazily: PIL parses
+# the header (EXIF, XMP, IPTC, JPEG tables) and never decodes pixels.
+
+EDITING_SOFTWARE = ['photoshop', 'gimp', 'canva', 'paint', 'editor', 'adobe',
+                    'lightroom', 'snapseed', 'facetune', 'picsart', 'pixlr']
+
+# IJG standard luminance quantization table (quality 50)
+STANDARD_LUMINANCE_TABLE = np.array([
+    16, 11, 10, 16, 24, 40, 51, 61, 12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56, 14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77, 24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101, 72, 92, 95, 98, 112, 100, 103, 99])
+
+# Table sums an IJG encoder produces at each quality 1-100 (entries are
+# rounded and clamped to 1-255, so low and high qualities are not linear)
+_IJG_SCALES = np.array([5000 // q if q < 50 else 200 - 2 * q for q in range(1, 101)])
+IJG_LUMINANCE_SUMS = np.clip((STANDARD_LUMINANCE_TABLE[None, :] * _IJG_SCALES[:, None] + 50) // 100,
+                             1, 255).sum(axis=1)
+
+EXIF_TAGS = {0x010F: 'Make', 0x0110: 'Model', 0x0131: 'Software',
+             0x0132: 'DateTime', 0x9003: 'DateTimeOriginal'}
+
+
+def estimate_jpeg_quality(quantization):
+    """Estimate IJG quality (1-100) from the luminance quantization table"""
+    if not quantization or 0 not in quantization:
+        return None
+    # Closest IJG table by sum (the sum does not depend on the zigzag order)
+    return int(np.argmin(np.abs(IJG_LUMINANCE_SUMS - sum(quantization[0])))) + 1
+
+
+def extract_metadata(image_path):
+    """Header-only metadata: EXIF fields, XMP/IPTC presence and JPEG parameters"""
+    with Image.open(image_path) as img:
+        metadata = {
+            "format": img.format,
+            "dimensions": img.size,
+            "mode": img.mode,
+            "exif": {},
+            "has_exif": False,
+            "has_xmp": False,
+            "has_iptc": False,
+            "xmp_edit_history": False,
+            "jpeg_quality": None,
+            "progressive": False,
+            "subsampling": None
+        }
+
+        exif = img.getexif()
+        if exif:
+            metadata["has_exif"] = True
+            sub_ifd = exif.get_ifd(0x8769)
+            for tag, name in EXIF_TAGS.items():
+                value = exif.get(tag, sub_ifd.get(tag))
+                if value is not None:
+                    metadata["exif"][name] = str(value).strip('\x00 ')
+
+        xmp = img.info.get('xmp') or img.info.get('XML:com.adobe.xmp')
+        if xmp:
+            metadata["has_xmp"] = True
+            text = xmp.decode('utf-8', 'ignore') if isinstance(xmp, bytes) else str(xmp)
+            metadata["xmp_edit_history"] = 'xmpMM:History' in text or 'photoshop:' in text
+
+        try:
+            metadata["has_iptc"] = bool(IptcImagePlugin.getiptcinfo(img))
+        except Exception:
+            metadata["has_iptc"] = False
+
+        if img.format == 'JPEG':
+            metadata["jpeg_quality"] = estimate_jpeg_quality(getattr(img, 'quantization', None))
+            metadata["progressive"] = bool(img.info.get('progressive') or img.info.get('progression'))
+            metadata["subsampling"] = JpegImagePlugin.get_sampling(img)
+
+    return metadata
+
+
+def triage_score(metadata):
+    """0-100 metadata suspicion score plus the reasons behind it"""
+    # Same weights as the Streamlit EXIF analysis, plus XMP/JPEG signals
+    score = 0
+    reasons = []
+    exif = metadata["exif"]
+
+    if not metadata["has_exif"]:
+        score += 40
+        reasons.append("no EXIF metadata")
+    if 'Make' not in exif or 'Model' not in exif:
+        score += 25
+        reasons.append("missing camera make/model")
+    software = exif.get('Software', '').lower()
+    if any(editor in software for editor in EDITING_SOFTWARE):
+        score += 35
+        reasons.append(f"editing software: {exif['Software']}")
+    if 'DateTime' not in exif and 'DateTimeOriginal' not in exif:
+        score += 20
+        reasons.append("missing creation date")
+    if metadata["format"] == 'PNG':
+        score += 15
+        reasons.append("PNG format")
+    if metadata["xmp_edit_history"]:
+        score += 20
+        reasons.append("XMP edit history")
+    if metadata["jpeg_quality"] is not None and metadata["has_exif"] and metadata["jpeg_quality"] < 75:
+        # Cameras save at high quality; low quality with EXIF suggests re-saving
+        score += 10
+        reasons.append(f"re-saved at JPEG quality {metadata['jpeg_quality']}")
+
+    return min(score, 100), reasons
+
+
+def triage_files(image_paths, check_thumbnails=False):
+    """Metadata triage of many files; returns results sorted by priority"""
+    results = []
+    for path in image_paths:
+        try:
+            metadata = extract_metadata(path)
+        except Exception as e:
+            results.append({"path": path, "triage_score": 100, "reasons": [f"unreadable: {e}"]})
+            continue
+
+        score, reasons = triage_score(metadata)
+        if check_thumbnails and metadata["format"] == 'JPEG':
+            thumbnail = check_thumbnail_consistency(path)
+            if "error" in thumbnail:
+                reasons.append(thumbnail["error"])
+            elif thumbnail["has_thumbnail"] and not thumbnail["consistent"]:
+                score = min(score + 35, 100)
+                reasons.append("EXIF thumbnail differs from image")
+
+        results.append({
+            "path": path,
+            "triage_score": score,
+            "reasons": reasons,
+            "format": metadata["format"],
+            "dimensions": metadata["dimensions"],
+            "camera": " ".join(filter(None, [metadata["exif"].get('Make'), metadata["exif"].get('Model')])) or None,
+            "software": metadata["exif"].get('Software'),
+            "jpeg_quality": metadata["jpeg_quality"]
+        })
+
+    # Highest score first: the order in which to run full pixel analysis
+    results.sort(key=lambda r: r["triage_score"], reverse=True)
+    return results
@@ -3,36 +3,129 @@ import cv2
 import numpy as np
 import json
 import pickle
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.svm import SVC
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
-from sklearn.preprocessing import StandardScaler
-import matplotlib.pyplot as plt
-import seaborn as sns
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from frequency_analysis import frequency_band_energies, analyze_gan_spectrum
+from texture_features import texture_features, LBP_BINS
+from quality_features import brisque_features, FEATURE_NAMES as BRISQUE_FEATURE_NAMES, QUALITY_FEATURE_VERSION
+from feature_store import FeatureStore, file_digest
+from model_bundle import ModelBundle, save_bundle, BUNDLE_FILENAME
+from forest_inference import CompactForest, COMPACT_FOREST_FILENAME
+from exemplar_index import ExemplarIndex, EXEMPLAR_INDEX_FILENAME
 import warnings
 warnings.filterwarnings('ignore')
 
+# sklearn, matplotlib and seaborn are imported where they are used: they
+# dominate start-up time and rf_only prediction through the NumPy forest
+# export never needs them.
+
+# Bump whenever extract_advanced_features changes so cached vectors are not reused
+FEATURE_EXTRACTOR_VERSION = 2
+
+# Feature groups in vector order: (group, extractor method, input, feature names).
+# A detector built with feature_profile computes only the listed groups.
+FEATURE_GROUPS = [
+    ("noise", "_extract_noise_features", "gray",
+     ['noise_variance_mean', 'noise_variance_std', 'noise_outliers_count']),
+    ("jpeg", "_extract_jpeg_features", "gray",
+     ['jpeg_artifacts_mean', 'jpeg_artifacts_std', 'jpeg_outliers_count']),
+    ("lighting", "_extract_lighting_features", "rgb",
+     ['lighting_variance_mean', 'lighting_variance_std', 'lighting_outliers_count']),
+    ("edge", "_extract_edge_features", "gray",
+     ['edge_density', 'edge_variance', 'edge_complexity']),
+    ("color", "_extract_color_features", "rgb",
+     ['color_histogram_chi2', 'color_variance_mean', 'color_variance_std']),
+    ("texture", "_extract_texture_features", "gray",
+     ['texture_contrast', 'texture_dissimilarity', 'texture_homogeneity', 'texture_energy', 'texture_correlation'] +
+     [f'lbp_uniform_{i}' for i in range(LBP_BINS - 1)] + ['lbp_nonuniform']),
+    ("gradient", "_extract_gradient_features", "gray",
+     ['gradient_magnitude_mean', 'gradient_magnitude_std']),
+    ("frequency", "_extract_frequency_features", "gray",
+     ['frequency_high_energy', 'frequency_low_energy'])
+]
+FEATURE_GROUP_NAMES = [group for group, _, _, _ in FEATURE_GROUPS]
+
+# SVM implementations: exact RBF SVC (Platt scaling by internal 5-fold CV), or
+# a Nystroem kernel approximation feeding a linear SVM with one sigmoid
+# calibration. The latter trains in roughly linear time and predicts in
+# constant time per image regardless of the number of training samples.
+SVM_BACKENDS = ("rbf", "nystroem")
+
+# Bundle kinds: the batch-trained ensemble (random forest + SVM), or a single
+# logistic model learned out of core by incremental_training.py
+MODEL_TYPES = ("ensemble", "linear")
+
+def source_image_name(filename):
+    """Original an image was made from (tampered copies are saved as tampered_<original>)
+
+    Used to keep an original and its tampered copy on the same side of a split.
+    """
+    name = os.path.basename(filename)
+    return name[len("tampered_"):] if name.startswith("tampered_") else name
+
+# Per-process detector used by the feature extraction pool
+_worker_detector = None
+
+def _init_feature_worker(use_quality_features, feature_profile=None):
+    """Pool initializer: one detector per worker, single-threaded OpenCV"""
+    global _worker_detector
+    cv2.setNumThreads(1)
+    _worker_detector = MLTamperingDetector(use_quality_features=use_quality_features,
+                                           feature_profile=feature_profile)
+
+def _extract_feature_worker(image):
+    """Extract one feature vector (path or RGB array) inside a pool worker"""
+    return _worker_detector._extract_item(image)
+
 class MLTamperingDetector:
-    def __init__(self, dataset_path="celebrity_dataset"):
+    def __init__(self, dataset_path="celebrity_dataset", use_quality_features=False, feature_store=None,
+                 feature_profile=None, svm_backend="rbf"):
+        if svm_backend not in SVM_BACKENDS:
+            raise ValueError(f"Unknown SVM backend '{svm_backend}', expected one of {SVM_BACKENDS}")
         self.dataset_path = dataset_path
+        self.svm_backend = svm_backend
+        self.use_quality_features = use_quality_features
+        self.feature_store = feature_store
+        self.training_info = {}
+        self.full_feature_version = f"v{FEATURE_EXTRACTOR_VERSION}" + (
+            f"-brisque{QUALITY_FEATURE_VERSION}" if use_quality_features else "")
+        
+        # Optional subset of FEATURE_GROUPS (e.g. a pruned "fast profile")
+        if feature_profile is None or list(feature_profile) == FEATURE_GROUP_NAMES:
+            self.feature_profile = None
+            self.feature_version = self.full_feature_version
+        else:
+            unknown = set(feature_profile) - set(FEATURE_GROUP_NAMES)
+            if unknown:
+                raise ValueError(f"Unknown feature groups: {sorted(unknown)}")
+            self.feature_profile = [g for g in FEATURE_GROUP_NAMES if g in feature_profile]
+            self.feature_version = self.full_feature_version + "-only-" + "+".join(self.feature_profile)
+        self.feature_groups = [entry for entry in FEATURE_GROUPS
+                               if self.feature_profile is None or entry[0] in self.feature_profile]
         self.original_dir = os.path.join(dataset_path, "original")
         self.tampered_dir = os.path.join(dataset_path, "tampered")
         
-        self.scaler = StandardScaler()
-        self.rf_model = RandomForestClassifier(n_estimators=100, random_state=42)
-        self.svm_model = SVC(kernel='rbf', probability=True, random_state=42)
-        
-        self.feature_names = [
-            'noise_variance_mean', 'noise_variance_std', 'noise_outliers_count',
-            'jpeg_artifacts_mean', 'jpeg_artifacts_std', 'jpeg_outliers_count',
-            'lighting_variance_mean', 'lighting_variance_std', 'lighting_outliers_count',
-            'edge_density', 'edge_variance', 'edge_complexity',
-            'color_histogram_chi2', 'color_variance_mean', 'color_variance_std',
-            'texture_contrast', 'texture_dissimilarity', 'texture_homogeneity',
-            'gradient_magnitude_mean', 'gradient_magnitude_std',
-            'frequency_high_energy', 'frequency_low_energy'
-        ]
+        # Models are created on first access (see __getattr__); the NumPy
+        # forest export is set by load_models/save_models
+        self.compact_forest = None
+        self.exemplar_index = None
+        self._exemplar_index_path = None
+        # Id of the last bundle save_models wrote; sidecar files carry it too
+        self.bundle_id = None
+        self.model_type = "ensemble"
+        
+        self.feature_names = [name for _, _, _, names in self.feature_groups for name in names]
+        
+        # Optional 36 no-reference quality features (models must be retrained)
+        if use_quality_features:
+            self.feature_names += ['brisque_' + name for name in BRISQUE_FEATURE_NAMES]
+        
+        # Columns of the full feature vector this detector uses
+        full_names = [name for _, _, _, names in FEATURE_GROUPS for name in names]
+        if use_quality_features:
+            full_names += ['brisque_' + name for name in BRISQUE_FEATURE_NAMES]
+        self.feature_columns = [full_names.index(name) for name in self.feature_names]
     
     def extract_advanced_features(self, image_path):
         """Extract comprehensive features for tampering detection"""
@@ -42,41 +135,22 @@ class MLTamperingDetector:
         
         # Convert to RGB
         image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        return self.extract_features_from_array(image_rgb)
+    
+    def extract_features_from_array(self, image_rgb):
+        """Extract the feature vector from an RGB array"""
         gray = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2GRAY)
         
         features = []
         
-        # 1. Noise Analysis Features
-        noise_features = self._extract_noise_features(gray)
-        features.extend(noise_features)
-        
-        # 2. JPEG Compression Features
-        jpeg_features = self._extract_jpeg_features(gray)
-        features.extend(jpeg_features)
-        
-        # 3. Lighting Consistency Features
-        lighting_features = self._extract_lighting_features(image_rgb)
-        features.extend(lighting_features)
-        
-        # 4. Edge Analysis Features
-        edge_features = self._extract_edge_features(gray)
-        features.extend(edge_features)
-        
-        # 5. Color Analysis Features
-        color_features = self._extract_color_features(image_rgb)
-        features.extend(color_features)
+        # Noise, JPEG, lighting, edge, color, texture, gradient and frequency
+        # groups (see FEATURE_GROUPS), restricted to the feature profile
+        for _, method, source, _ in self.feature_groups:
+            features.extend(getattr(self, method)(gray if source == "gray" else image_rgb))
         
-        # 6. Texture Features
-        texture_features = self._extract_texture_features(gray)
-        features.extend(texture_features)
-        
-        # 7. Gradient Features
-        gradient_features = self._extract_gradient_features(gray)
-        features.extend(gradient_features)
-        
-        # 8. Frequency Domain Features
-        freq_features = self._extract_frequency_features(gray)
-        features.extend(freq_features)
+        # No-reference quality features
+        if self.use_quality_features:
+            features.extend(brisque_features(gray))
         
         return np.array(features)
     
@@ -202,33 +276,8 @@ class MLTamperingDetector:
         return [chi2_rg, np.mean(color_vars), np.std(color_vars)]
     
     def _extract_texture_features(self, gray):
-        """Extract texture features using simple statistical methods"""
-        # Resize if too large for efficient processing
-        if gray.shape[0] > 512 or gray.shape[1] > 512:
-            gray = cv2.resize(gray, (512, 512))
-        
-        # Calculate texture measures using local binary patterns approach
-        # Compute local standard deviation as texture measure
-        kernel_size = 9
-        kernel = np.ones((kernel_size, kernel_size), np.float32) / (kernel_size * kernel_size)
-        
-        # Local mean
-        local_mean = cv2.filter2D(gray.astype(np.float32), -1, kernel)
-        
-        # Local variance (texture measure)
-        local_var = cv2.filter2D((gray.astype(np.float32) - local_mean)**2, -1, kernel)
-        
-        # Texture contrast (difference between max and min in local regions)
-        local_max = cv2.dilate(gray, np.ones((kernel_size, kernel_size), np.uint8))
-        local_min = cv2.erode(gray, np.ones((kernel_size, kernel_size), np.uint8))
-        contrast = local_max.astype(np.float32) - local_min.astype(np.float32)
-        
-        # Calculate statistics
-        texture_contrast = np.mean(contrast)
-        texture_variance = np.mean(local_var)
-        texture_homogeneity = 1.0 / (1.0 + np.mean(local_var))  # Inverse of variance for homogeneity
-        
-        return [texture_contrast, texture_variance, texture_homogeneity]
+        """Extract GLCM properties and the uniform LBP histogram (aspect-preserving proxy)"""
+        return texture_features(gray)
     
     def _extract_gradient_features(self, gray):
         """Extract gradient-based features"""
@@ -243,63 +292,138 @@ class MLTamperingDetector:
     
     def _extract_frequency_features(self, gray):
         """Extract frequency domain features"""
-        # FFT
-        f_transform = np.fft.fft2(gray)
-        f_shift = np.fft.fftshift(f_transform)
-        magnitude_spectrum = np.abs(f_shift)
+        # Half-spectrum rfft2 on float32 with cached band masks per image shape
+        high_freq_energy, low_freq_energy = frequency_band_energies(gray)
         
-        h, w = magnitude_spectrum.shape
-        center_h, center_w = h // 2, w // 2
-        
-        # High frequency energy (corners)
-        high_freq_mask = np.ones((h, w))
-        high_freq_mask[center_h-h//4:center_h+h//4, center_w-w//4:center_w+w//4] = 0
-        high_freq_energy = np.sum(magnitude_spectrum * high_freq_mask)
+        return [high_freq_energy, low_freq_energy]
+    
+    def extract_spectrum_features(self, image_path):
+        """Extract GAN spectral fingerprint (azimuthal spectrum + upsampling score)"""
+        gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            return None
         
-        # Low frequency energy (center)
-        low_freq_mask = 1 - high_freq_mask
-        low_freq_energy = np.sum(magnitude_spectrum * low_freq_mask)
+        return analyze_gan_spectrum(gray)
+    
+    def extract_quality_features(self, image_path):
+        """Extract the 36 BRISQUE-style no-reference quality features"""
+        gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            return None
         
-        return [high_freq_energy, low_freq_energy]
+        return brisque_features(gray)
     
-    def load_dataset(self):
-        """Load and extract features from the dataset"""
+    def load_dataset(self, n_workers=None, progress_callback=None):
+        """Load and extract features from the dataset
+        
+        n_workers: extraction processes (None = all cores, 1 = in-process)
+        progress_callback: called as progress_callback(done, total)
+        """
         print("Loading dataset and extracting features...")
         
+        # Original images are label 0, tampered images label 1
+        samples = []
+        for label, folder in ((0, self.original_dir), (1, self.tampered_dir)):
+            for filename in os.listdir(folder):
+                if filename.endswith('.jpg'):
+                    samples.append((os.path.join(folder, filename), label, filename))
+        
+        vectors = self._features_for_paths([path for path, _, _ in samples], n_workers, progress_callback)
+        
         features = []
         labels = []
         filenames = []
-        
-        # Load original images (label = 0)
-        original_files = [f for f in os.listdir(self.original_dir) if f.endswith('.jpg')]
-        for filename in original_files:
-            filepath = os.path.join(self.original_dir, filename)
-            feature_vector = self.extract_advanced_features(filepath)
-            if feature_vector is not None:
-                features.append(feature_vector)
-                labels.append(0)  # 0 = original
-                filenames.append(filename)
-                print(f"Processed original: {filename}")
-        
-        # Load tampered images (label = 1)
-        tampered_files = [f for f in os.listdir(self.tampered_dir) if f.endswith('.jpg')]
-        for filename in tampered_files:
-            filepath = os.path.join(self.tampered_dir, filename)
-            feature_vector = self.extract_advanced_features(filepath)
+        for (_, label, filename), feature_vector in zip(samples, vectors):
             if feature_vector is not None:
                 features.append(feature_vector)
-                labels.append(1)  # 1 = tampered
+                labels.append(label)
                 filenames.append(filename)
-                print(f"Processed tampered: {filename}")
         
+        print(f"Extracted features for {len(features)}/{len(samples)} images")
         return np.array(features), np.array(labels), filenames
     
-    def train_models(self):
+    def _extract_item(self, image):
+        """Feature vector for a path or an RGB array"""
+        if isinstance(image, str):
+            return self.extract_advanced_features(image)
+        return self.extract_features_from_array(image)
+    
+    def _extract_many(self, paths, n_workers=None, progress_callback=None):
+        """Extract feature vectors for paths (or RGB arrays) in order, on a process pool"""
+        n_workers = min(n_workers or os.cpu_count() or 1, len(paths))
+        if progress_callback is None:
+            step = max(len(paths) // 10, 1)
+            def progress_callback(done, total):
+                if done % step == 0 or done == total:
+                    print(f"Extracted {done}/{total}")
+        
+        if n_workers <= 1:
+            results = map(self._extract_item, paths)
+            executor = None
+        else:
+            # Chunks amortize IPC; map keeps input order
+            chunksize = max(1, len(paths) // (n_workers * 4))
+            executor = ProcessPoolExecutor(n_workers, initializer=_init_feature_worker,
+                                           initargs=(self.use_quality_features, self.feature_profile))
+            results = executor.map(_extract_feature_worker, paths, chunksize=chunksize)
+        
+        vectors = []
+        try:
+            for vector in results:
+                vectors.append(vector)
+                progress_callback(len(vectors), len(paths))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return vectors
+    
+    def _features_for_paths(self, paths, n_workers=None, progress_callback=None):
+        """Feature vectors for paths, served from the feature store when possible"""
+        if self.feature_store is None:
+            digests = [None] * len(paths)
+            vectors = [None] * len(paths)
+        else:
+            digests = [file_digest(path) for path in paths]
+            vectors = self.feature_store.get_many(digests, self.feature_version)
+            if self.feature_profile is not None:
+                # A profile's features are columns of the full vector
+                full = self.feature_store.get_many(digests, self.full_feature_version)
+                vectors = [v if v is not None or f is None else f[self.feature_columns]
+                           for v, f in zip(vectors, full)]
+            cached = sum(v is not None for v in vectors)
+            if cached:
+                print(f"Loaded {cached}/{len(paths)} feature vectors from cache")
+        
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if not missing:
+            return vectors
+        
+        new_digests, new_vectors = [], []
+        extracted = self._extract_many([paths[i] for i in missing], n_workers, progress_callback)
+        for i, vector in zip(missing, extracted):
+            if vector is None:
+                continue
+            if digests[i] is not None:
+                # Same precision as the store so cold and warm runs train identically
+                vector = vector.astype(np.float32)
+                new_digests.append(digests[i])
+                new_vectors.append(vector)
+            vectors[i] = vector
+        
+        if new_digests:
+            self.feature_store.put_many(new_digests, self.feature_version, new_vectors)
+        
+        return vectors
+    
+    def train_models(self, n_workers=None, progress_callback=None, models_dir="trained_models", plots=True):
         """Train machine learning models"""
+        from sklearn.model_selection import train_test_split
+        from sklearn.metrics import accuracy_score, classification_report
+        
         print("Training machine learning models...")
         
         # Load dataset
-        X, y, filenames = self.load_dataset()
+        X, y, filenames = self.load_dataset(n_workers, progress_callback)
         
         print(f"Dataset loaded: {len(X)} samples, {len(self.feature_names)} features")
         print(f"Original images: {np.sum(y == 0)}")
@@ -347,11 +471,23 @@ class MLTamperingDetector:
         for i, (feature, importance) in enumerate(importance_df[:10]):
             print(f"{i+1}. {feature}: {importance:.4f}")
         
+        # Nearest-example lookup over every labelled sample
+        self.exemplar_index = ExemplarIndex(self.feature_version)
+        self.exemplar_index.add(self.scaler.transform(X), y, filenames)
+        
         # Save models
-        self.save_models()
+        self.model_type = "ensemble"
+        self.training_info = {
+            "trained_at": time.strftime('%Y-%m-%d %H:%M:%S'),
+            "n_samples": int(len(X)),
+            "rf_accuracy": float(rf_accuracy),
+            "svm_accuracy": float(svm_accuracy)
+        }
+        self.save_models(models_dir)
         
         # Create visualizations
-        self.create_evaluation_plots(y_test, rf_pred, svm_pred, feature_importance)
+        if plots:
+            self.create_evaluation_plots(y_test, rf_pred, svm_pred, feature_importance)
         
         return {
             'rf_accuracy': rf_accuracy,
@@ -359,27 +495,141 @@ class MLTamperingDetector:
             'feature_importance': importance_df
         }
     
-    def save_models(self):
-        """Save trained models and scaler"""
-        models_dir = "trained_models"
-        os.makedirs(models_dir, exist_ok=True)
-        
-        # Save models
-        with open(os.path.join(models_dir, "rf_model.pkl"), 'wb') as f:
-            pickle.dump(self.rf_model, f)
-        
-        with open(os.path.join(models_dir, "svm_model.pkl"), 'wb') as f:
-            pickle.dump(self.svm_model, f)
-        
-        with open(os.path.join(models_dir, "scaler.pkl"), 'wb') as f:
-            pickle.dump(self.scaler, f)
-        
-        print(f"Models saved to {models_dir}/")
+    # Models that load_models serves lazily from a bundle
+    BUNDLE_MODELS = ("rf_model", "svm_model", "scaler")
+    LINEAR_BUNDLE_MODELS = ("linear_model", "scaler")
+    # Metadata that save_models derives from the detector itself; the rest is training_info
+    BUNDLE_METADATA_KEYS = ("feature_names", "feature_version", "feature_profile", "svm_backend",
+                            "use_quality_features", "model_type", "bundle_id", "saved_at")
     
-    def load_models(self):
-        """Load pre-trained models"""
-        models_dir = "trained_models"
+    @property
+    def bundle_models(self):
+        """Names of the models a bundle of this detector's model_type holds"""
+        return self.LINEAR_BUNDLE_MODELS if self.model_type == "linear" else self.BUNDLE_MODELS
+    
+    def _new_model(self, name):
+        """Untrained default for one of BUNDLE_MODELS or LINEAR_BUNDLE_MODELS"""
+        if name == "scaler":
+            from sklearn.preprocessing import StandardScaler
+            return StandardScaler()
+        if name == "rf_model":
+            from sklearn.ensemble import RandomForestClassifier
+            return RandomForestClassifier(n_estimators=100, random_state=42)
+        if name == "linear_model":
+            from sklearn.linear_model import SGDClassifier
+            return SGDClassifier(loss='log_loss', alpha=1e-4, random_state=42)
+        if self.svm_backend == "nystroem":
+            from sklearn.calibration import CalibratedClassifierCV
+            from sklearn.kernel_approximation import Nystroem
+            from sklearn.pipeline import make_pipeline
+            from sklearn.svm import LinearSVC
+            # Same kernel width as SVC's gamma='scale' on standardized features
+            approximate = make_pipeline(Nystroem(kernel='rbf', n_components=300, random_state=42),
+                                        LinearSVC(C=1.0, random_state=42))
+            return CalibratedClassifierCV(approximate, method='sigmoid', cv=3, ensemble=False)
+        from sklearn.svm import SVC
+        return SVC(kernel='rbf', probability=True, random_state=42)
+    
+    def __getattr__(self, name):
+        """Fetch a model from the loaded bundle (or a fresh default) on first access"""
+        if name not in self.BUNDLE_MODELS + self.LINEAR_BUNDLE_MODELS:
+            raise AttributeError(name)
+        bundle = self.__dict__.get("_bundle")
+        if bundle is None or name not in bundle.model_names():
+            model = self._new_model(name)
+            setattr(self, name, model)
+            return model
+        
+        # load_models has already checked the bundle's feature version
+        model = bundle.get(name)
+        setattr(self, name, model)
+        return model
+    
+    def save_models(self, models_dir="trained_models"):
+        """Save trained models, scaler and metadata as one versioned bundle"""
+        metadata = {
+            "feature_names": self.feature_names,
+            "feature_version": self.feature_version,
+            "feature_profile": self.feature_profile,
+            "svm_backend": self.svm_backend,
+            "use_quality_features": self.use_quality_features,
+            "model_type": self.model_type
+        }
+        metadata.update(self.training_info)
+        
+        models = {name: getattr(self, name) for name in self.bundle_models}
+        if self.model_type == "ensemble":
+            # Read the saved index while the loaded bundle id can still vouch for it
+            self.get_exemplar_index()
+        else:
+            # Vectors indexed under the ensemble's scaler do not match the linear model's
+            self.exemplar_index = None
+            self._exemplar_index_path = None
+        # The in-memory models are now authoritative over any loaded bundle
+        self._bundle = None
+        self.bundle_id = metadata["bundle_id"] = uuid.uuid4().hex
+        # Written before the bundle, which is what reloaders watch; the shared
+        # id keeps a sidecar from a failed or older save from pairing with it
+        if self.model_type == "ensemble":
+            self.compact_forest = CompactForest.from_sklearn(self.rf_model, self.scaler, self.feature_version,
+                                                             self.bundle_id)
+            self.compact_forest.save(os.path.join(models_dir, COMPACT_FOREST_FILENAME))
+        else:
+            self.compact_forest = None
+        if self.exemplar_index is not None:
+            self.exemplar_index.bundle_id = self.bundle_id
+            self.exemplar_index.save(os.path.join(models_dir, EXEMPLAR_INDEX_FILENAME))
+        save_bundle(os.path.join(models_dir, BUNDLE_FILENAME), models, metadata)
+        
+        print(f"Models saved to {models_dir}/{BUNDLE_FILENAME}")
+    
+    @classmethod
+    def from_models_dir(cls, models_dir="trained_models", **kwargs):
+        """Detector configured like the bundle in models_dir (feature profile, quality features, SVM backend)
+
+        Returns None if there is no loadable bundle. kwargs are passed to the
+        constructor (dataset_path, feature_store).
+        """
+        bundle_path = os.path.join(models_dir, BUNDLE_FILENAME)
+        if not os.path.exists(bundle_path):
+            return None
+        metadata = ModelBundle(bundle_path).metadata
+        detector = cls(use_quality_features=metadata.get("use_quality_features", False),
+                       feature_profile=metadata.get("feature_profile"),
+                       svm_backend=metadata.get("svm_backend", "rbf"), **kwargs)
+        return detector if detector.load_models(models_dir) else None
+    
+    def load_models(self, models_dir="trained_models", mmap_mode='c'):
+        """Load pre-trained models (lazily, memory-mapped from the bundle)"""
+        bundle_path = os.path.join(models_dir, BUNDLE_FILENAME)
+        if os.path.exists(bundle_path):
+            # Only the manifest is read here; each model is loaded on first use
+            bundle = ModelBundle(bundle_path, mmap_mode=mmap_mode)
+            trained_on = bundle.metadata.get("feature_version")
+            if trained_on != self.feature_version:
+                print(f"Model bundle {bundle_path} was trained on features {trained_on}, "
+                      f"detector extracts {self.feature_version}. Please retrain the models.")
+                return False
+            model_type = bundle.metadata.get("model_type", "ensemble")
+            if model_type not in MODEL_TYPES:
+                print(f"Model bundle {bundle_path} holds unknown model type '{model_type}'")
+                return False
+            # Drop the untrained defaults so __getattr__ serves bundle models
+            for name in self.BUNDLE_MODELS + self.LINEAR_BUNDLE_MODELS:
+                self.__dict__.pop(name, None)
+            self._bundle = bundle
+            self.model_type = model_type
+            # Kept so that saving the loaded models again does not drop the training stats
+            self.training_info = {key: value for key, value in bundle.metadata.items()
+                                  if key not in self.BUNDLE_METADATA_KEYS}
+            self.compact_forest = self._load_compact_forest(models_dir)
+            # Loaded on first use (unpickling the trees imports sklearn)
+            self.exemplar_index = None
+            self._exemplar_index_path = os.path.join(models_dir, EXEMPLAR_INDEX_FILENAME)
+            print("Models loaded successfully!")
+            return True
         
+        # Older installs: three separate pickles
         try:
             with open(os.path.join(models_dir, "rf_model.pkl"), 'rb') as f:
                 self.rf_model = pickle.load(f)
@@ -390,59 +640,159 @@ class MLTamperingDetector:
             with open(os.path.join(models_dir, "scaler.pkl"), 'rb') as f:
                 self.scaler = pickle.load(f)
             
+            self.compact_forest = CompactForest.from_sklearn(self.rf_model, self.scaler, self.feature_version,
+                                                             self.bundle_id)
             print("Models loaded successfully!")
             return True
         except FileNotFoundError:
             print("No pre-trained models found. Please train the models first.")
             return False
     
-    def predict_image(self, image_path):
+    def _load_compact_forest(self, models_dir):
+        """NumPy forest export next to the bundle, if present and current"""
+        path = os.path.join(models_dir, COMPACT_FOREST_FILENAME)
+        if not os.path.exists(path):
+            return None
+        forest = CompactForest.load(path)
+        if forest.feature_version != self.feature_version or not self._matches_bundle(forest):
+            return None
+        return forest
+    
+    def _current_bundle_id(self):
+        """Id of the bundle the sklearn models come from (from the bundle manifest)"""
+        bundle = self.__dict__.get("_bundle")
+        return bundle.metadata.get("bundle_id") if bundle is not None else self.bundle_id
+    
+    def _matches_bundle(self, sidecar):
+        """Whether a forest export or exemplar index was saved with the current models"""
+        return sidecar is not None and getattr(sidecar, "bundle_id", None) == self._current_bundle_id()
+    
+    def get_exemplar_index(self):
+        """The exemplar index for the loaded models, or None if there is none"""
+        if self.exemplar_index is None and self._exemplar_index_path and os.path.exists(self._exemplar_index_path):
+            index = ExemplarIndex.load(self._exemplar_index_path)
+            # Indexed vectors are only comparable under the scaler they were saved with
+            if index.feature_version == self.feature_version and self._matches_bundle(index):
+                self.exemplar_index = index
+            self._exemplar_index_path = None
+        return self.exemplar_index
+    
+    def add_exemplars(self, image_paths, labels, models_dir="trained_models"):
+        """Insert newly labelled images (0 = original, 1 = tampered) into the exemplar index and save it"""
+        vectors = self._features_for_paths(list(image_paths), n_workers=1)
+        keep = [i for i, vector in enumerate(vectors) if vector is not None]
+        if not keep:
+            return 0
+        
+        index = self.get_exemplar_index()
+        if index is None:
+            index = self.exemplar_index = ExemplarIndex(self.feature_version, bundle_id=self._current_bundle_id())
+        index.add(self.scaler.transform(np.array([vectors[i] for i in keep])),
+                  [labels[i] for i in keep], [os.path.basename(image_paths[i]) for i in keep])
+        index.save(os.path.join(models_dir, EXEMPLAR_INDEX_FILENAME))
+        return len(keep)
+    
+    def predict_image(self, image_path, rf_only=False):
         """Predict if an image is tampered using trained models"""
-        # Extract features
-        features = self.extract_advanced_features(image_path)
-        if features is None:
-            return {"error": "Could not process image"}
-        
-        # Scale features
-        features_scaled = self.scaler.transform([features])
-        
-        # Make predictions
-        rf_pred = self.rf_model.predict(features_scaled)[0]
-        rf_prob = self.rf_model.predict_proba(features_scaled)[0]
-        
-        svm_pred = self.svm_model.predict(features_scaled)[0] 
-        svm_prob = self.svm_model.predict_proba(features_scaled)[0]
-        
-        # Ensemble prediction (average probabilities)
-        ensemble_prob = (rf_prob + svm_prob) / 2
+        return self.predict_images([image_path], n_workers=1, rf_only=rf_only)[0]
+    
+    def predict_images(self, images, n_workers=None, progress_callback=None, rf_only=False, exemplars=3):
+        """Predict many images (paths or RGB arrays); one predict_image-style dict each
+        
+        Features are extracted in parallel, then the scaler and each model run
+        once on the stacked matrix. Labels are taken from the probabilities.
+        With rf_only, only the NumPy forest export is used (no sklearn models
+        are loaded) and the ensemble is the random forest alone. Otherwise the
+        `exemplars` nearest known originals and tampered images are attached
+        when an exemplar index exists. A linear bundle (incremental_training.py)
+        answers with its single model.
+        """
+        if rf_only and self.compact_forest is None:
+            raise ValueError("rf_only prediction needs the NumPy forest export; retrain or re-save the models")
+        
+        if len(images) == 0:
+            return []
+        
+        vectors = self._extract_many(list(images), n_workers, progress_callback or (lambda done, total: None))
+        valid = [i for i, vector in enumerate(vectors) if vector is not None]
+        results = [{"error": "Could not process image"} for _ in vectors]
+        if not valid:
+            return results
+        
+        features = np.array([vectors[i] for i in valid])
+        if rf_only:
+            # The export carries its own scaler, so it stands alone without the bundle
+            rf_probs = self.compact_forest.predict_proba(features)
+            rf_preds = self.compact_forest.classes_[np.argmax(rf_probs, axis=1)]
+            for row, i in enumerate(valid):
+                image_path = images[i] if isinstance(images[i], str) else f"image_{i}"
+                results[i] = self._prediction_result(image_path, {"random_forest": (rf_preds[row], rf_probs[row])},
+                                                     rf_probs[row])
+            return results
+        
+        features_scaled = self.scaler.transform(features)
+        if self.model_type == "linear":
+            probs = self.linear_model.predict_proba(features_scaled)
+            preds = self.linear_model.classes_[np.argmax(probs, axis=1)]
+            for row, i in enumerate(valid):
+                image_path = images[i] if isinstance(images[i], str) else f"image_{i}"
+                results[i] = self._prediction_result(image_path, {"linear": (preds[row], probs[row])}, probs[row])
+            return results
+        
+        # The NumPy export gives bit-identical probabilities without sklearn's per-tree overhead,
+        # provided it was saved with the bundle whose scaler produced features_scaled
+        if self._matches_bundle(self.compact_forest):
+            rf_probs = self.compact_forest.predict_proba_scaled(features_scaled)
+            rf_classes = self.compact_forest.classes_
+        else:
+            rf_probs = self.rf_model.predict_proba(features_scaled)
+            rf_classes = self.rf_model.classes_
+        svm_probs = self.svm_model.predict_proba(features_scaled)
+        rf_preds = rf_classes[np.argmax(rf_probs, axis=1)]
+        svm_preds = self.svm_model.classes_[np.argmax(svm_probs, axis=1)]
+        ensemble_probs = (rf_probs + svm_probs) / 2
+        
+        index = self.get_exemplar_index() if exemplars else None
+        neighbours = index.query(features_scaled, exemplars) if index is not None else None
+        
+        for row, i in enumerate(valid):
+            image_path = images[i] if isinstance(images[i], str) else f"image_{i}"
+            results[i] = self._prediction_result(image_path, {"random_forest": (rf_preds[row], rf_probs[row]),
+                                                              "svm": (svm_preds[row], svm_probs[row])},
+                                                 ensemble_probs[row])
+            if neighbours is not None:
+                results[i]["exemplars"] = neighbours[row]
+        return results
+    
+    def _prediction_result(self, image_path, members, ensemble_prob):
+        """Result dict shared by predict_image and predict_images; members maps model name to (pred, prob)"""
         ensemble_pred = 1 if ensemble_prob[1] > 0.5 else 0
         
-        result = {
+        predictions = {}
+        for name, (pred, prob) in members.items():
+            predictions[name] = {
+                "prediction": "Tampered" if pred == 1 else "Original",
+                "confidence": float(max(prob)),
+                "tampered_probability": float(prob[1])
+            }
+        predictions["ensemble"] = {
+            "prediction": "Tampered" if ensemble_pred == 1 else "Original",
+            "confidence": float(max(ensemble_prob)),
+            "tampered_probability": float(ensemble_prob[1])
+        }
+        
+        return {
             "image_path": image_path,
-            "predictions": {
-                "random_forest": {
-                    "prediction": "Tampered" if rf_pred == 1 else "Original",
-                    "confidence": float(max(rf_prob)),
-                    "tampered_probability": float(rf_prob[1])
-                },
-                "svm": {
-                    "prediction": "Tampered" if svm_pred == 1 else "Original", 
-                    "confidence": float(max(svm_prob)),
-                    "tampered_probability": float(svm_prob[1])
-                },
-                "ensemble": {
-                    "prediction": "Tampered" if ensemble_pred == 1 else "Original",
-                    "confidence": float(max(ensemble_prob)),
-                    "tampered_probability": float(ensemble_prob[1])
-                }
-            },
+            "predictions": predictions,
             "recommendation": "Tampered" if ensemble_pred == 1 else "Original"
         }
-        
-        return result
     
     def create_evaluation_plots(self, y_test, rf_pred, svm_pred, feature_importance):
         """Create evaluation visualizations"""
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+        from sklearn.metrics import accuracy_score, confusion_matrix
+        
         fig, axes = plt.subplots(2, 2, figsize=(15, 12))
         fig.suptitle('ML Tampering Detection Model Evaluation', fontsize=16)
         
@@ -494,7 +844,7 @@ class MLTamperingDetector:
         print("Evaluation plots saved as 'ml_model_evaluation.png'")
 
 def main():
-    detector = MLTamperingDetector()
+    detector = MLTamperingDetector(feature_store=FeatureStore())
     
     print("=== ML-Based Celebrity Image Tampering Detection ===")
     print("1. Training models on celebrity dataset...")
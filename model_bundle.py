@@ -0,0 +1,108 @@
+import os
+import re
+import time
+import uuid
+import joblib
+
+# One versioned bundle holding every trained model plus the metadata needed to
+# use them safely (feature names, extractor version, training stats). The
+# bundle file itself is a small manifest: metadata and the file name of each
+# model. Models are written uncompressed to their own files first, so each
+# one is unpickled only when asked for and its numpy arrays can be
+# memory-mapped: processes that map the same model share those pages through
+# the OS page cache. Copy-on-write maps ('c') are the default because libsvm
+# rejects read-only buffers even though it never writes to them.
+#
+# Model files carry a per-save token, and the manifest is replaced last and
+# atomically, so a reader sees either the old set of models or the new one.
+# The previous save's files are kept for readers that still hold the old
+# manifest; older ones are removed.
+
+BUNDLE_FORMAT_VERSION = 2
+BUNDLE_FILENAME = "tampering_models.joblib"
+
+
+def _model_path(path, token, name):
+    return f"{os.path.splitext(path)[0]}.{token}.{name}.joblib"
+
+
+def _remove_stale_models(path, keep):
+    """Delete model files of this bundle that are not in keep (basenames)"""
+    directory = os.path.dirname(path) or "."
+    pattern = re.compile(re.escape(os.path.basename(os.path.splitext(path)[0])) + r"\.[0-9a-f]{12}\.\w+\.joblib$")
+    for filename in os.listdir(directory):
+        if pattern.match(filename) and filename not in keep:
+            try:
+                os.remove(os.path.join(directory, filename))
+            except OSError:
+                # Still mapped by a running process on platforms that lock open files
+                pass
+
+
+def save_bundle(path, models, metadata):
+    """Write each model to its own file, then the manifest atomically"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    token = uuid.uuid4().hex[:12]
+    files = {}
+    for name, model in models.items():
+        model_path = _model_path(path, token, name)
+        joblib.dump(model, model_path, compress=0)
+        files[name] = os.path.basename(model_path)
+
+    previous = set()
+    if os.path.exists(path):
+        try:
+            previous = set(ModelBundle(path).model_files())
+        except Exception:
+            pass
+
+    payload = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "metadata": dict(metadata, saved_at=time.strftime('%Y-%m-%d %H:%M:%S')),
+        "models": files
+    }
+    # Readers never see a half-written bundle
+    tmp_path = path + ".tmp"
+    joblib.dump(payload, tmp_path, compress=0)
+    os.replace(tmp_path, path)
+    _remove_stale_models(path, set(files.values()) | previous)
+
+
+class ModelBundle:
+    def __init__(self, path, mmap_mode='c'):
+        self.path = path
+        self.mmap_mode = mmap_mode
+        self.mtime = os.path.getmtime(path)
+        self._payload = None
+        self._models = {}
+
+    def _load(self):
+        """Read the manifest on first use (format 1 bundles hold the models inline)"""
+        if self._payload is None:
+            payload = joblib.load(self.path, mmap_mode=self.mmap_mode)
+            if payload.get("format_version") not in (1, BUNDLE_FORMAT_VERSION):
+                raise ValueError(f"Unsupported model bundle format: {payload.get('format_version')}")
+            self._payload = payload
+        return self._payload
+
+    @property
+    def metadata(self):
+        return self._load()["metadata"]
+
+    def model_names(self):
+        return list(self._load()["models"].keys())
+
+    def model_files(self):
+        """Basenames of the per-model files (none for format 1 bundles)"""
+        payload = self._load()
+        return list(payload["models"].values()) if payload["format_version"] > 1 else []
+
+    def get(self, name):
+        """Return one model, loading only that model (raises KeyError if the bundle lacks it)"""
+        payload = self._load()
+        if payload["format_version"] == 1:
+            return payload["models"][name]
+        if name not in self._models:
+            model_path = os.path.join(os.path.dirname(self.path), payload["models"][name])
+            self._models[name] = joblib.load(model_path, mmap_mode=self.mmap_mode)
+        return self._models[name]
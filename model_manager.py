@@ -0,0 +1,144 @@
+import os
+import threading
+import numpy as np
+from ml_tampering_detector import MLTamperingDetector
+from model_bundle import BUNDLE_FILENAME
+
+# Zero-downtime model updates for long-running apps. Requests take a reference
+# to the current detector and keep using it; a retrained bundle is loaded and
+# checked on a canary set in the background, then swapped in with a single
+# reference assignment. A bundle that fails validation is never served.
+#
+# The canary set must be held out from training: by default it is read from
+# a "canary" folder in the models directory (original/ and tampered/
+# subfolders). A candidate has to score at least as well on it as the model
+# being served, and at least min_canary_accuracy if one is given.
+
+CANARY_DIRNAME = "canary"
+
+
+def default_canary(canary_dir):
+    """Labelled images from a held-out folder: [(path, label)]"""
+    canary = []
+    for label, folder in ((0, "original"), (1, "tampered")):
+        folder = os.path.join(canary_dir, folder)
+        if os.path.isdir(folder):
+            files = sorted(f for f in os.listdir(folder) if f.lower().endswith(('.jpg', '.jpeg', '.png')))
+            canary.extend((os.path.join(folder, f), label) for f in files)
+    return canary
+
+
+def canary_accuracy(detector, canary):
+    """Ensemble accuracy of a detector on [(path, label)]; raises if any image cannot be scored"""
+    results = detector.predict_images([path for path, _ in canary], n_workers=1)
+    if any("error" in r for r in results):
+        raise ValueError("canary images could not be scored")
+
+    probabilities = np.array([r["predictions"]["ensemble"]["tampered_probability"] for r in results])
+    if not np.all(np.isfinite(probabilities)):
+        raise ValueError("canary probabilities are not finite")
+
+    predicted = (probabilities > 0.5).astype(int)
+    return float(np.mean(predicted == np.array([label for _, label in canary])))
+
+
+class ModelManager:
+    def __init__(self, models_dir="trained_models", detector_factory=MLTamperingDetector,
+                 canary=None, canary_dir=None, min_canary_accuracy=None, poll_interval=5.0):
+        self.models_dir = models_dir
+        self.bundle_path = os.path.join(models_dir, BUNDLE_FILENAME)
+        self.detector_factory = detector_factory
+        self.canary = canary
+        self.canary_dir = canary_dir if canary_dir is not None else os.path.join(models_dir, CANARY_DIRNAME)
+        self.min_canary_accuracy = min_canary_accuracy
+        self.poll_interval = poll_interval
+
+        self.detector = None
+        self.generation = 0
+        self.last_error = None
+        self._signature = None
+        self._reload_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _bundle_signature(self):
+        """(mtime, size) of the bundle file, or None if it does not exist"""
+        try:
+            stat = os.stat(self.bundle_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _validate(self, detector):
+        """Load every model and score the canary set; raises on failure"""
+        for name in detector.bundle_models:
+            getattr(detector, name)
+
+        canary = self.canary if self.canary is not None else default_canary(self.canary_dir)
+        if not canary:
+            return
+
+        accuracy = canary_accuracy(detector, canary)
+        if self.min_canary_accuracy is not None and accuracy < self.min_canary_accuracy:
+            raise ValueError(f"canary accuracy {accuracy:.2f} below {self.min_canary_accuracy:.2f}")
+        if self.detector is not None:
+            # Scored now rather than cached: the canary folder may have changed since
+            try:
+                current = canary_accuracy(self.detector, canary)
+            except ValueError:
+                current = 0.0
+            if accuracy < current:
+                raise ValueError(f"canary accuracy {accuracy:.2f} below the served model's {current:.2f}")
+
+    def check_for_update(self):
+        """Reload if the bundle changed; returns True when a new detector was swapped in"""
+        with self._reload_lock:
+            signature = self._bundle_signature()
+            if signature is None:
+                # No bundle yet: try the legacy pickles once at startup
+                if self.detector is not None or self._signature == "legacy":
+                    return False
+                signature = "legacy"
+            if signature == self._signature:
+                return False
+
+            candidate = self.detector_factory()
+            try:
+                if not candidate.load_models(self.models_dir):
+                    raise ValueError("no models found")
+                self._validate(candidate)
+            except Exception as e:
+                # Keep serving the current models; retry only when the file changes again
+                self._signature = signature
+                self.last_error = str(e)
+                print(f"Rejected model bundle {self.bundle_path}: {e}")
+                return False
+
+            # Single reference swap: in-flight requests finish on the old detector
+            self.detector = candidate
+            self._signature = signature
+            self.generation += 1
+            self.last_error = None
+            print(f"Serving model bundle generation {self.generation}")
+            return True
+
+    def _watch(self):
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.check_for_update()
+            except Exception as e:
+                self.last_error = str(e)
+
+    def start(self):
+        """Watch the bundle in a background thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background watcher"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,183 @@
+import json
+import time
+import argparse
+import numpy as np
+from joblib import Parallel, delayed
+from scipy.stats import randint, loguniform
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.svm import SVC
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.model_selection import StratifiedKFold, ParameterGrid, ParameterSampler
+from sklearn.metrics import accuracy_score, roc_auc_score
+from ml_tampering_detector import MLTamperingDetector
+from feature_store import FeatureStore
+
+# Model selection on one extracted feature matrix. Every (candidate, fold)
+# pair is an independent job on a process pool; features come from the
+# feature store, so folds and candidates never re-extract. Each candidate is
+# reported with accuracy, AUC, fit time and single-image latency so models
+# can be picked from the speed/accuracy frontier rather than accuracy alone.
+
+RF_GRID = {
+    "n_estimators": [50, 100, 200, 400],
+    "max_depth": [None, 8, 16],
+    "max_features": ["sqrt", 0.5]
+}
+SVM_GRID = {
+    "C": [0.1, 1, 10, 100],
+    "gamma": ["scale", 0.01, 0.1]
+}
+RF_DISTRIBUTIONS = {
+    "n_estimators": randint(25, 400),
+    "max_depth": [None, 4, 8, 16, 32],
+    "max_features": ["sqrt", "log2", 0.3, 0.5, 1.0],
+    "min_samples_leaf": randint(1, 5)
+}
+SVM_DISTRIBUTIONS = {
+    "C": loguniform(1e-2, 1e3),
+    "gamma": loguniform(1e-4, 1)
+}
+BASE_MODELS = {
+    # Same defaults as MLTamperingDetector; n_jobs=1 because folds run in parallel
+    "random_forest": RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=1),
+    "svm": SVC(kernel='rbf', probability=True, random_state=42)
+}
+
+
+def candidate_models(search="grid", n_iter=10, random_state=42):
+    """[(model_name, params)] for a grid or random search over both models"""
+    spaces = {"random_forest": (RF_GRID, RF_DISTRIBUTIONS), "svm": (SVM_GRID, SVM_DISTRIBUTIONS)}
+    candidates = []
+    for name, (grid, distributions) in spaces.items():
+        if search == "grid":
+            params = ParameterGrid(grid)
+        else:
+            params = ParameterSampler(distributions, n_iter=n_iter, random_state=random_state)
+        candidates.extend((name, p) for p in params)
+    return candidates
+
+
+def _evaluate_fold(name, params, X, y, train_idx, test_idx, latency_repeats=5):
+    """Fit one candidate on one fold; returns its metrics"""
+    model = make_pipeline(StandardScaler(), clone(BASE_MODELS[name]).set_params(**params))
+
+    start = time.perf_counter()
+    model.fit(X[train_idx], y[train_idx])
+    fit_time = time.perf_counter() - start
+
+    probs = model.predict_proba(X[test_idx])[:, 1]
+
+    # Single-image latency (scaler + model), best of a few calls
+    single = X[test_idx[:1]]
+    timings = []
+    for _ in range(latency_repeats):
+        start = time.perf_counter()
+        model.predict_proba(single)
+        timings.append(time.perf_counter() - start)
+
+    return {
+        "accuracy": accuracy_score(y[test_idx], (probs > 0.5).astype(int)),
+        "auc": roc_auc_score(y[test_idx], probs),
+        "fit_time": fit_time,
+        "latency_ms": min(timings) * 1000
+    }
+
+
+def pareto_frontier(results):
+    """Indices of candidates no other candidate beats on both accuracy and latency"""
+    frontier = []
+    for i, r in enumerate(results):
+        dominated = any(
+            o["accuracy"] >= r["accuracy"] and o["latency_ms"] <= r["latency_ms"] and
+            (o["accuracy"] > r["accuracy"] or o["latency_ms"] < r["latency_ms"])
+            for o in results
+        )
+        if not dominated:
+            frontier.append(i)
+    return frontier
+
+
+def run_model_selection(X, y, candidates, n_folds=5, n_jobs=-1, random_state=42):
+    """Cross-validate every candidate in parallel; one summary dict per candidate"""
+    folds = list(StratifiedKFold(n_folds, shuffle=True, random_state=random_state).split(X, y))
+    jobs = [(c, f) for c in range(len(candidates)) for f in range(len(folds))]
+
+    fold_metrics = Parallel(n_jobs=n_jobs)(
+        delayed(_evaluate_fold)(candidates[c][0], candidates[c][1], X, y, *folds[f])
+        for c, f in jobs
+    )
+
+    results = []
+    for c, (name, params) in enumerate(candidates):
+        metrics = [m for (job_c, _), m in zip(jobs, fold_metrics) if job_c == c]
+        accuracies = [m["accuracy"] for m in metrics]
+        results.append({
+            "model": name,
+            "params": params,
+            "accuracy": float(np.mean(accuracies)),
+            "accuracy_std": float(np.std(accuracies)),
+            "auc": float(np.mean([m["auc"] for m in metrics])),
+            "fit_time": float(np.mean([m["fit_time"] for m in metrics])),
+            "latency_ms": float(np.mean([m["latency_ms"] for m in metrics]))
+        })
+
+    for i in pareto_frontier(results):
+        results[i]["frontier"] = True
+    return sorted(results, key=lambda r: (-r["accuracy"], r["latency_ms"]))
+
+
+def _format_param(value):
+    """Hyperparameter as it would be written in code; floats stay floats (1.0, not 1)"""
+    if isinstance(value, float):
+        return repr(float(f"{value:.4g}"))
+    return repr(value.item() if isinstance(value, np.generic) else value)
+
+
+def print_report(results):
+    """Table of candidates, best accuracy first; * marks the speed/accuracy frontier"""
+    print(f"{'':2}{'model':<14}{'accuracy':>14}{'auc':>8}{'fit s':>9}{'ms/img':>9}  params")
+    print("-" * 90)
+    for r in results:
+        mark = "*" if r.get("frontier") else " "
+        params = ", ".join(f"{k}={_format_param(v)}" for k, v in r["params"].items())
+        print(f"{mark} {r['model']:<14}{r['accuracy']:>8.3f}±{r['accuracy_std']:.3f}{r['auc']:>8.3f}"
+              f"{r['fit_time']:>9.3f}{r['latency_ms']:>9.2f}  {params}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cross-validated model selection on cached features')
+    parser.add_argument('--dataset', default='celebrity_dataset', help='Dataset folder with original/ and tampered/')
+    parser.add_argument('--search', choices=['grid', 'random'], default='grid', help='Search strategy')
+    parser.add_argument('--n-iter', type=int, default=10, help='Candidates per model for random search')
+    parser.add_argument('--folds', type=int, default=5, help='Stratified CV folds')
+    parser.add_argument('--jobs', type=int, default=-1, help='Parallel jobs (-1 = all cores)')
+    parser.add_argument('--quality-features', action='store_true', help='Include BRISQUE-style quality features')
+    parser.add_argument('--output', '-o', help='Save results as JSON')
+
+    args = parser.parse_args()
+
+    # Features are extracted (or read from the store) exactly once
+    detector = MLTamperingDetector(args.dataset, use_quality_features=args.quality_features,
+                                   feature_store=FeatureStore())
+    X, y, _ = detector.load_dataset()
+
+    candidates = candidate_models(args.search, args.n_iter)
+    print(f"Evaluating {len(candidates)} candidates x {args.folds} folds on {len(X)} images...")
+    start = time.time()
+    results = run_model_selection(X, y, candidates, args.folds, args.jobs)
+    print(f"Done in {time.time() - start:.1f} seconds\n")
+
+    print_report(results)
+    print("\n* = on the accuracy/latency frontier (latency excludes feature extraction)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'search': args.search, 'folds': args.folds, 'n_images': int(len(X)),
+                       'feature_version': detector.feature_version, 'results': results,
+                       'analysis_timestamp': time.strftime('%Y-%m-%d %H:%M:%S')}, f, indent=2, default=str)
+        print(f"\n📄 Results saved to: {args.output}")
+
+if __name__ == "__main__":
+    main()
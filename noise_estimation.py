@@ -0,0 +1,42 @@
+import numpy as np
+
+# Wavelet noise estimation. The diagonal (HH) subband of a single-level Haar
+# transform is dominated by sensor noise, and its median absolute deviation
+# is a robust sigma estimate (Donoho & Johnstone) that ignores edges.
+
+MAD_SCALE = 0.6745
+
+
+def haar_hh_subband(gray):
+    """Single-level Haar HH subband (half resolution, float32)"""
+    h, w = gray.shape[:2]
+    x = np.asarray(gray)[:h - h % 2, :w - w % 2].astype(np.float32)
+    return (x[0::2, 0::2] - x[0::2, 1::2] - x[1::2, 0::2] + x[1::2, 1::2]) * 0.5
+
+
+def estimate_noise(gray, tile_size=32):
+    """Return global noise sigma and a per-tile sigma map (tile_size in pixels)"""
+    hh = np.abs(haar_hh_subband(gray))
+    sigma = float(np.median(hh) / MAD_SCALE)
+
+    # Tiles in subband coordinates are half the pixel tile size
+    t = tile_size // 2
+    rows, cols = hh.shape[0] // t, hh.shape[1] // t
+    if rows == 0 or cols == 0:
+        return sigma, np.zeros((0, 0), np.float32)
+
+    tiles = hh[:rows * t, :cols * t].reshape(rows, t, cols, t).transpose(0, 2, 1, 3)
+    noise_map = np.median(tiles.reshape(rows, cols, t * t), axis=-1) / MAD_SCALE
+    return sigma, noise_map.astype(np.float32)
+
+
+def find_noise_outliers(noise_map, tile_size=32, threshold=2.0):
+    """List ((i, j), sigma) for tiles whose sigma deviates from the image"""
+    if noise_map.size == 0:
+        return []
+
+    mean_sigma = np.mean(noise_map)
+    std_sigma = np.std(noise_map)
+    rows, cols = np.nonzero(np.abs(noise_map - mean_sigma) > threshold * std_sigma)
+    return [((int(r * tile_size), int(c * tile_size)), float(noise_map[r, c]))
+            for r, c in zip(rows, cols)]
@@ -0,0 +1,288 @@
+import os
+import json
+import argparse
+import cv2
+import numpy as np
+from frequency_analysis import block_dct
+from model_bundle import ModelBundle, save_bundle
+from ml_tampering_detector import source_image_name
+
+# Patch-level tampering localization. The image-level feature families
+# (noise, JPEG/DCT, lighting, edges, color, texture, gradient, frequency) are
+# computed once per image as dense maps; every overlapping patch then reads
+# its statistics from integral images of those maps, so the cost per patch is
+# a few lookups. Each patch also gets its deviation from the image median,
+# since tampering shows up as a local inconsistency. All patches of an image
+# are scored in one model call and averaged into a per-pixel heatmap.
+
+PATCH_BUNDLE_FILENAME = "patch_localizer.joblib"
+NOISE_KERNEL = np.array([[-1, -1, -1], [-1, 8, -1], [-1, -1, -1]], np.float32)
+BASE_PATCH_FEATURES = [
+    'noise_variance', 'jpeg_artifacts_mean', 'jpeg_artifacts_std', 'lighting_mean', 'edge_density',
+    'color_variance', 'texture_contrast', 'gradient_magnitude_mean', 'gradient_magnitude_std',
+    'frequency_high_ratio'
+]
+PATCH_FEATURE_NAMES = BASE_PATCH_FEATURES + [name + '_deviation' for name in BASE_PATCH_FEATURES]
+# Pair-difference threshold (9x9 mean of the max channel difference) separating
+# edits from re-compression noise when a dataset has no region metadata
+DIFFERENCE_THRESHOLD = 20.0
+
+
+def patch_grid(shape, patch_size=64, stride=32):
+    """Top-left corners (ys, xs) of overlapping patches; empty when the image is smaller than a patch"""
+    h, w = shape[:2]
+    ys = np.arange(0, h - patch_size + 1, stride)
+    xs = np.arange(0, w - patch_size + 1, stride)
+    return ys, xs
+
+
+def _window_sums(integral, ys, xs, size):
+    """Sums over size x size windows at every (y, x) corner, from an integral image"""
+    top, bottom = ys[:, np.newaxis], ys[:, np.newaxis] + size
+    left, right = xs[np.newaxis, :], xs[np.newaxis, :] + size
+    return integral[bottom, right] - integral[top, right] - integral[bottom, left] + integral[top, left]
+
+
+def _window_mean_var(values, ys, xs, size):
+    """Per-window mean and variance of a map"""
+    total, squared = cv2.integral2(np.ascontiguousarray(values, dtype=np.float32),
+                                   sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+    area = float(size * size)
+    mean = _window_sums(total, ys, xs, size) / area
+    return mean, np.maximum(_window_sums(squared, ys, xs, size) / area - mean ** 2, 0.0)
+
+
+def _window_mean(values, ys, xs, size):
+    return _window_sums(cv2.integral(np.ascontiguousarray(values, dtype=np.float32), sdepth=cv2.CV_64F),
+                        ys, xs, size) / float(size * size)
+
+
+def patch_features(image_rgb, patch_size=64, stride=32):
+    """(features (n_patches, 20), ys, xs) for every patch on the grid"""
+    if patch_size % 8 or stride % 8:
+        raise ValueError("patch_size and stride must be multiples of the 8x8 DCT grid")
+    ys, xs = patch_grid(image_rgb.shape, patch_size, stride)
+    if len(ys) == 0 or len(xs) == 0:
+        return np.empty((0, len(PATCH_FEATURE_NAMES)), np.float32), ys, xs
+    gray = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2GRAY)
+    gray_f = gray.astype(np.float32)
+
+    # Shared per-image maps
+    residual = cv2.filter2D(gray_f, -1, NOISE_KERNEL)
+    grad_x = cv2.Sobel(gray_f, cv2.CV_32F, 1, 0, ksize=3)
+    grad_y = cv2.Sobel(gray_f, cv2.CV_32F, 0, 1, ksize=3)
+    magnitude = cv2.magnitude(grad_x, grad_y)
+    lightness = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2LAB)[:, :, 0]
+    edges = (cv2.Canny(gray, 50, 150) > 0).astype(np.float32)
+    structuring = np.ones((9, 9), np.uint8)
+    contrast = cv2.subtract(cv2.dilate(gray, structuring), cv2.erode(gray, structuring))
+
+    # DCT grid: one value per 8x8 block, patches cover whole blocks
+    coefficients = np.abs(block_dct(gray))
+    high = coefficients[..., 4:, 4:].sum(axis=(-2, -1))
+    block_total = coefficients.sum(axis=(-2, -1))
+    by, bx = ys // 8, xs // 8
+    jpeg_mean, jpeg_var = _window_mean_var(high, by, bx, patch_size // 8)
+    high_ratio = _window_mean(high, by, bx, patch_size // 8) / (_window_mean(block_total, by, bx, patch_size // 8) + 1e-6)
+
+    _, noise_var = _window_mean_var(residual, ys, xs, patch_size)
+    gradient_mean, gradient_var = _window_mean_var(magnitude, ys, xs, patch_size)
+    color_var = np.mean([_window_mean_var(image_rgb[:, :, c], ys, xs, patch_size)[1] for c in range(3)], axis=0)
+
+    base = np.stack([
+        noise_var, jpeg_mean, np.sqrt(jpeg_var), _window_mean(lightness, ys, xs, patch_size),
+        _window_mean(edges, ys, xs, patch_size), color_var, _window_mean(contrast, ys, xs, patch_size),
+        gradient_mean, np.sqrt(gradient_var), high_ratio
+    ], axis=-1).reshape(-1, len(BASE_PATCH_FEATURES))
+
+    deviation = base - np.median(base, axis=0)
+    return np.hstack([base, deviation]).astype(np.float32), ys, xs
+
+
+def region_mask(shape, region):
+    """Binary tampering mask from a dataset-metadata region entry"""
+    h, w = shape[:2]
+    mask = np.zeros((h, w), np.uint8)
+    if region.get("whole_image"):
+        mask[:] = 1
+    for x, y, bw, bh in region.get("boxes", []):
+        mask[max(y, 0):y + bh, max(x, 0):x + bw] = 1
+    for cx, cy, r in region.get("circles", []):
+        cv2.circle(mask, (cx, cy), r, 1, -1)
+    return mask
+
+
+def difference_mask(original_rgb, tampered_rgb, threshold=DIFFERENCE_THRESHOLD):
+    """Tampering mask from an original/tampered pair (for datasets without regions)"""
+    difference = cv2.absdiff(original_rgb, tampered_rgb).max(axis=2).astype(np.float32)
+    return (cv2.blur(difference, (9, 9)) > threshold).astype(np.uint8)
+
+
+def patch_labels(mask, ys, xs, patch_size, min_fraction=0.25):
+    """1 where at least min_fraction of a patch is tampered, 0 where none is, -1 in between"""
+    fraction = _window_mean(mask, ys, xs, patch_size).ravel()
+    labels = np.full(fraction.shape, -1, dtype=int)
+    labels[fraction >= min_fraction] = 1
+    labels[fraction == 0] = 0
+    return labels
+
+
+def _read_rgb(path):
+    image = cv2.imread(path)
+    return None if image is None else cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+class PatchLocalizer:
+    def __init__(self, patch_size=64, stride=32):
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.preprocessing import StandardScaler
+        self.patch_size = patch_size
+        self.stride = stride
+        self.scaler = StandardScaler()
+        self.model = RandomForestClassifier(n_estimators=100, min_samples_leaf=2, random_state=42)
+
+    def training_patches(self, dataset_path="celebrity_dataset", negatives_per_positive=1.0, seed=42):
+        """Labelled patch features from the dataset, balanced between classes: (X, y, groups)
+
+        groups names the original image each patch comes from (an original and
+        its tampered copy share one), since overlapping patches of one image,
+        or of an image and its copy, must not be split between train and test.
+        """
+        original_dir = os.path.join(dataset_path, "original")
+        tampered_dir = os.path.join(dataset_path, "tampered")
+        metadata_path = os.path.join(dataset_path, "dataset_metadata.json")
+        regions = {}
+        if os.path.exists(metadata_path):
+            with open(metadata_path, 'r') as f:
+                regions = json.load(f).get("tampering_regions", {})
+
+        positives, negatives = [], []
+        positive_groups, negative_groups = [], []
+        for filename in sorted(f for f in os.listdir(tampered_dir) if f.endswith('.jpg')):
+            tampered = _read_rgb(os.path.join(tampered_dir, filename))
+            if tampered is None:
+                continue
+            features, ys, xs = patch_features(tampered, self.patch_size, self.stride)
+            if len(features) == 0:
+                continue
+            if filename in regions:
+                mask = region_mask(tampered.shape, regions[filename])
+            else:
+                # Older datasets: recover the edited area from the untouched original
+                original = _read_rgb(os.path.join(original_dir, filename[len("tampered_"):]))
+                if original is None or original.shape != tampered.shape:
+                    continue
+                mask = difference_mask(original, tampered)
+            labels = patch_labels(mask, ys, xs, self.patch_size)
+            positives.append(features[labels == 1])
+            negatives.append(features[labels == 0])
+            source = source_image_name(filename)
+            positive_groups.extend([source] * int(np.sum(labels == 1)))
+            negative_groups.extend([source] * int(np.sum(labels == 0)))
+
+        # Every patch of an original image is clean
+        for filename in sorted(f for f in os.listdir(original_dir) if f.endswith('.jpg')):
+            original = _read_rgb(os.path.join(original_dir, filename))
+            if original is not None:
+                features = patch_features(original, self.patch_size, self.stride)[0]
+                negatives.append(features)
+                negative_groups.extend([filename] * len(features))
+
+        if not positive_groups:
+            raise ValueError(f"No tampered patches found in {dataset_path}; "
+                             "check that tampered/ has images with known or recoverable edited regions")
+        if not negative_groups:
+            raise ValueError(f"No clean patches found in {dataset_path}")
+        positives = np.vstack(positives)
+        negatives = np.vstack(negatives)
+        n_negatives = min(len(negatives), int(len(positives) * negatives_per_positive))
+        chosen = np.random.RandomState(seed).choice(len(negatives), n_negatives, replace=False)
+        X = np.vstack([positives, negatives[chosen]])
+        y = np.concatenate([np.ones(len(positives), int), np.zeros(n_negatives, int)])
+        groups = np.concatenate([np.array(positive_groups), np.array(negative_groups)[chosen]])
+        return X, y, groups
+
+    def train(self, dataset_path="celebrity_dataset"):
+        """Fit the patch classifier; returns held-out patch accuracy"""
+        from sklearn.model_selection import GroupShuffleSplit
+        X, y, groups = self.training_patches(dataset_path)
+        print(f"Training on {len(X)} patches ({int(y.sum())} tampered) from {len(set(groups))} images")
+        # Held-out images, not held-out patches: neighbouring patches overlap
+        train_idx, test_idx = next(GroupShuffleSplit(1, test_size=0.2, random_state=42).split(X, y, groups))
+        X_train, X_test, y_train, y_test = X[train_idx], X[test_idx], y[train_idx], y[test_idx]
+        self.model.fit(self.scaler.fit_transform(X_train), y_train)
+        accuracy = float(np.mean(self.model.predict(self.scaler.transform(X_test)) == y_test))
+        print(f"Patch accuracy (held out): {accuracy:.3f}")
+        return accuracy
+
+    def predict_heatmap(self, image_rgb):
+        """Per-pixel tampering probability (float32, image size), averaged over overlapping patches"""
+        features, ys, xs = patch_features(image_rgb, self.patch_size, self.stride)
+        h, w = image_rgb.shape[:2]
+        if len(features) == 0:
+            # Smaller than one patch: nothing to score
+            return np.zeros((h, w), np.float32)
+        probabilities = self.model.predict_proba(self.scaler.transform(features))[:, 1]
+        probabilities = probabilities.reshape(len(ys), len(xs))
+
+        total = np.zeros((h, w), np.float32)
+        count = np.zeros((h, w), np.float32)
+        for i, y in enumerate(ys):
+            for j, x in enumerate(xs):
+                total[y:y + self.patch_size, x:x + self.patch_size] += probabilities[i, j]
+                count[y:y + self.patch_size, x:x + self.patch_size] += 1
+        return total / np.maximum(count, 1)
+
+    def save(self, models_dir="trained_models"):
+        save_bundle(os.path.join(models_dir, PATCH_BUNDLE_FILENAME),
+                    {"scaler": self.scaler, "model": self.model},
+                    {"patch_size": self.patch_size, "stride": self.stride, "feature_names": PATCH_FEATURE_NAMES})
+
+    @classmethod
+    def load(cls, models_dir="trained_models"):
+        bundle = ModelBundle(os.path.join(models_dir, PATCH_BUNDLE_FILENAME))
+        localizer = cls(bundle.metadata["patch_size"], bundle.metadata["stride"])
+        localizer.scaler = bundle.get("scaler")
+        localizer.model = bundle.get("model")
+        return localizer
+
+
+def heatmap_overlay(image_rgb, heatmap, alpha=0.45):
+    """RGB image with the heatmap blended on top"""
+    colored = cv2.applyColorMap((np.clip(heatmap, 0, 1) * 255).astype(np.uint8), cv2.COLORMAP_JET)
+    return cv2.addWeighted(image_rgb, 1 - alpha, cv2.cvtColor(colored, cv2.COLOR_BGR2RGB), alpha, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Patch-level tampering localization')
+    parser.add_argument('--models-dir', default='trained_models', help='Where the patch model is kept')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    train_parser = subparsers.add_parser('train', help='Train the patch classifier')
+    train_parser.add_argument('--dataset', default='celebrity_dataset', help='Folder with original/ and tampered/')
+    train_parser.add_argument('--patch-size', type=int, default=64, help='Patch size (multiple of 8)')
+    train_parser.add_argument('--stride', type=int, default=32, help='Patch stride (multiple of 8)')
+    predict_parser = subparsers.add_parser('predict', help='Write a tampering heatmap for an image')
+    predict_parser.add_argument('image_path', help='Image to analyze')
+    predict_parser.add_argument('--output', '-o', help='Heatmap overlay PNG (default: <image>_heatmap.png)')
+
+    args = parser.parse_args()
+
+    if args.command == 'train':
+        localizer = PatchLocalizer(args.patch_size, args.stride)
+        localizer.train(args.dataset)
+        localizer.save(args.models_dir)
+        print(f"Patch model saved to {args.models_dir}/{PATCH_BUNDLE_FILENAME}")
+        return
+
+    image_rgb = _read_rgb(args.image_path)
+    if image_rgb is None:
+        print(f"Error: could not read '{args.image_path}'")
+        return
+    heatmap = PatchLocalizer.load(args.models_dir).predict_heatmap(image_rgb)
+    output = args.output or os.path.splitext(args.image_path)[0] + "_heatmap.png"
+    cv2.imwrite(output, cv2.cvtColor(heatmap_overlay(image_rgb, heatmap), cv2.COLOR_RGB2BGR))
+    print(f"Peak tampering probability: {heatmap.max():.3f}")
+    print(f"Heatmap saved to: {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+import os
+import json
+import cv2
+import numpy as np
+from scipy import fft as sp_fft
+
+# Sensor pattern noise (PRNU) fingerprints. A camera's fingerprint K is
+# estimated from reference images as sum(W * I) / sum(I^2), where W is the
+# noise residual of image I. A query from the same camera contains I * K in
+# its own residual, which is measured with the peak-to-correlation energy (PCE)
+# of their cross-correlation.
+
+SUPPORTED_FORMATS = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif']
+PCE_MATCH_THRESHOLD = 60.0
+
+
+def load_gray(image):
+    """Load a path or RGB/gray array as float32 grayscale"""
+    if isinstance(image, str):
+        gray = cv2.imread(image, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            return None
+    elif len(image.shape) == 3:
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    else:
+        gray = image
+    return gray.astype(np.float32)
+
+
+def extract_noise_residual(gray):
+    """Noise residual W = I - denoise(I) with row/column means removed"""
+    denoised = cv2.GaussianBlur(gray, (0, 0), 1.0)
+    residual = gray - denoised
+
+    # Remove linear pattern (row/column artifacts shared by all cameras)
+    residual -= residual.mean(axis=1, keepdims=True)
+    residual -= residual.mean(axis=0, keepdims=True)
+    return residual
+
+
+def _rotate(gray, k):
+    """gray rotated by k * 90 degrees (contiguous)"""
+    return gray if k == 0 else np.ascontiguousarray(np.rot90(gray, k))
+
+
+def _orientations(gray, shape):
+    """Candidate (k, view) pairs of the query in the fingerprint's orientation
+
+    A portrait shot of a landscape sensor is a 90 degree rotation one way or
+    the other, so both rotations are returned for the caller to score.
+    """
+    if gray.shape == tuple(shape):
+        return [(0, gray)]
+    if gray.shape == tuple(shape)[::-1]:
+        return [(k, _rotate(gray, k)) for k in (1, 3)]
+    return []
+
+
+def peak_to_correlation_energy(residual, template, peak_radius=5):
+    """Signed PCE at zero shift, batched over any leading axes"""
+    residual = residual - residual.mean(axis=(-2, -1), keepdims=True)
+    template = template - template.mean(axis=(-2, -1), keepdims=True)
+
+    shape = residual.shape[-2:]
+    spectrum = sp_fft.rfft2(residual, axes=(-2, -1)) * np.conj(sp_fft.rfft2(template, axes=(-2, -1)))
+    xcorr = sp_fft.irfft2(spectrum, s=shape, axes=(-2, -1))
+
+    # Correlation energy outside the (wrapped) neighbourhood of the peak
+    energy = xcorr ** 2
+    near = np.r_[0:peak_radius + 1, -peak_radius:0]
+    near_energy = energy[..., near, :][..., near].sum(axis=(-2, -1))
+    n_far = shape[0] * shape[1] - len(near) ** 2
+    far_energy = (energy.sum(axis=(-2, -1)) - near_energy) / max(n_far, 1)
+
+    peak = xcorr[..., 0, 0]
+    return np.sign(peak) * peak ** 2 / (far_energy + 1e-12)
+
+
+class PRNUFingerprintStore:
+    def __init__(self, store_dir="prnu_fingerprints"):
+        self.store_dir = store_dir
+        self.index_path = os.path.join(store_dir, "index.json")
+        os.makedirs(store_dir, exist_ok=True)
+        self.index = self._load_index()
+        self._cache = {}
+
+    def _load_index(self):
+        """Load device metadata index"""
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def _save_index(self):
+        """Write device metadata index atomically"""
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def _fingerprint_path(self, device_id):
+        """Path of a device's fingerprint file; device ids may not leave the store"""
+        if not device_id or ".." in device_id or any(sep in device_id for sep in ("/", "\\", os.sep)):
+            raise ValueError(f"Invalid device id: {device_id!r}")
+        return os.path.join(self.store_dir, f"{device_id}.npy")
+
+    def list_devices(self):
+        """Return the ids of stored fingerprints"""
+        return sorted(self.index.keys())
+
+    def build_fingerprint(self, device_id, folder_path, max_images=None):
+        """Estimate a device fingerprint from a folder of reference images"""
+        path = self._fingerprint_path(device_id)
+        print(f"Building PRNU fingerprint for '{device_id}' from {folder_path}")
+
+        # Running sums keep memory constant regardless of folder size
+        numerator = None
+        denominator = None
+        shape = None
+        used = 0
+
+        for filename in sorted(os.listdir(folder_path)):
+            if not any(filename.lower().endswith(fmt) for fmt in SUPPORTED_FORMATS):
+                continue
+            gray = load_gray(os.path.join(folder_path, filename))
+            if gray is None:
+                continue
+
+            if shape is None:
+                shape = gray.shape
+                numerator = np.zeros(shape, np.float32)
+                denominator = np.zeros(shape, np.float32)
+            if gray.shape != shape:
+                # Rotated references would need the fingerprint to pick a direction
+                print(f"Skipping {filename}: size or orientation differs from reference")
+                continue
+
+            numerator += extract_noise_residual(gray) * gray
+            denominator += gray * gray
+            used += 1
+            if max_images and used >= max_images:
+                break
+
+        if used == 0:
+            print("No usable reference images found.")
+            return False
+
+        fingerprint = numerator / (denominator + 1.0)
+        np.save(path, fingerprint.astype(np.float32))
+
+        self.index[device_id] = {
+            "shape": list(shape),
+            "num_images": used,
+            "source_folder": folder_path
+        }
+        self._save_index()
+        self._cache.pop(device_id, None)
+
+        print(f"Fingerprint saved from {used} images ({shape[1]}x{shape[0]})")
+        return True
+
+    def remove_device(self, device_id):
+        """Delete a stored fingerprint"""
+        if device_id not in self.index:
+            return False
+        self._cache.pop(device_id, None)
+        del self.index[device_id]
+        self._save_index()
+        path = self._fingerprint_path(device_id)
+        if os.path.exists(path):
+            os.remove(path)
+        return True
+
+    def load_fingerprint(self, device_id):
+        """Memory-map a stored fingerprint (float32, read-only)"""
+        if device_id not in self._cache:
+            self._cache[device_id] = np.load(self._fingerprint_path(device_id), mmap_mode='r')
+        return self._cache[device_id]
+
+    def _best_orientation(self, gray, fingerprint):
+        """(rotation k, PCE) for the orientation of gray that best matches the fingerprint"""
+        best = (None, None)
+        for k, query in _orientations(gray, fingerprint.shape):
+            pce = float(peak_to_correlation_energy(extract_noise_residual(query), query * fingerprint))
+            if best[1] is None or pce > best[1]:
+                best = (k, pce)
+        return best
+
+    def _match_gray(self, gray, device_ids=None):
+        """({device: PCE}, {device: rotation k}) for a loaded grayscale image"""
+        scores, rotations = {}, {}
+        for device_id in device_ids or self.list_devices():
+            k, pce = self._best_orientation(gray, self.load_fingerprint(device_id))
+            if k is not None:
+                scores[device_id] = pce
+                rotations[device_id] = k
+        return scores, rotations
+
+    def match_image(self, image, device_ids=None):
+        """Score an image against stored fingerprints; returns {device: PCE}"""
+        gray = load_gray(image)
+        if gray is None:
+            return {}
+        return self._match_gray(gray, device_ids)[0]
+
+    def match_tiles(self, image, device_id, tile_size=128, rotation=None):
+        """Per-tile PCE map of an image against one device fingerprint
+
+        rotation: k of np.rot90 that aligns the image with the fingerprint, as
+        found by matching; it is searched for when not given.
+        """
+        gray = load_gray(image)
+        if gray is None:
+            return None
+
+        fingerprint = self.load_fingerprint(device_id)
+        if rotation is None:
+            rotation, _ = self._best_orientation(gray, fingerprint)
+            if rotation is None:
+                return None
+        query = _rotate(gray, rotation)
+        if query.shape != fingerprint.shape:
+            return None
+
+        residual = extract_noise_residual(query)
+        template = query * fingerprint
+
+        # Batch all tiles through one FFT call
+        rows, cols = query.shape[0] // tile_size, query.shape[1] // tile_size
+        if rows == 0 or cols == 0:
+            return np.zeros((0, 0), np.float32)
+
+        def to_tiles(x):
+            x = x[:rows * tile_size, :cols * tile_size]
+            return x.reshape(rows, tile_size, cols, tile_size).transpose(0, 2, 1, 3)
+
+        return peak_to_correlation_energy(to_tiles(residual), to_tiles(template)).astype(np.float32)
+
+    def analyze_image(self, image, tile_size=128, threshold=PCE_MATCH_THRESHOLD, tile_threshold=5.0):
+        """Identify the source device and localize tiles missing its PRNU"""
+        gray = load_gray(image)
+        if gray is None:
+            return {"device": None, "scores": {}, "missing_tiles": [], "confidence": 0.0}
+        scores, rotations = self._match_gray(gray)
+        if not scores:
+            return {"device": None, "scores": scores, "missing_tiles": [], "confidence": 0.0}
+
+        device_id = max(scores, key=scores.get)
+        if scores[device_id] < threshold:
+            return {"device": None, "scores": scores, "missing_tiles": [], "confidence": 0.0}
+
+        # Image comes from a known camera: tiles without its PRNU are suspicious
+        # Reuses the orientation found while matching instead of scoring it again
+        pce_map = self.match_tiles(gray, device_id, tile_size=tile_size, rotation=rotations[device_id])
+        rows, cols = np.nonzero(pce_map < tile_threshold)
+        missing = [((int(r * tile_size), int(c * tile_size)), float(pce_map[r, c]))
+                   for r, c in zip(rows, cols)]
+
+        confidence = min(len(missing) / max(pce_map.size, 1) * 5.0, 1.0)
+        return {"device": device_id, "scores": scores, "missing_tiles": missing, "confidence": confidence}
@@ -4,10 +4,15 @@ import os
 from PIL import Image, ImageFilter
 import json
 from sklearn.preprocessing import StandardScaler
+from frequency_analysis import block_dct, DCT8
+from quality_features import brisque_features, FEATURE_NAMES as BRISQUE_FEATURE_NAMES
+from noise_estimation import estimate_noise
 import warnings
 warnings.filterwarnings('ignore')
 
 class QualityBasedTamperingDetector:
+    NOISE_KERNEL = np.array([[-1, -1, -1], [-1, 8, -1], [-1, -1, -1]])
+    
     def __init__(self):
         self.results = {}
         
@@ -152,7 +157,148 @@ class QualityBasedTamperingDetector:
         
         return color_score, color_consistency
     
-    def analyze_image_quality(self, image_path):
+    def compute_quality_metrics(self, image):
+        """Fused single-pass version of the six calculate_* metrics"""
+        # One gray conversion shared by every metric
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY) if len(image.shape) == 3 else image
+        
+        # Blur: Laplacian values are small integers, exact in float32;
+        # meanStdDev accumulates in double precision
+        _, lap_std = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_32F))
+        laplacian_var = np.float64(lap_std[0, 0] ** 2)
+        blur_score = min(laplacian_var / 500.0, 1.0)
+        
+        # Sharpness: float32 Sobel pair and magnitude
+        grad_x = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=3)
+        grad_y = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=3)
+        sharpness = np.float64(cv2.mean(cv2.magnitude(grad_x, grad_y))[0])
+        sharpness_score = min(sharpness / 50.0, 1.0)
+        
+        # Noise: same saturating uint8 high-pass as calculate_noise_level
+        noise = cv2.filter2D(gray, -1, self.NOISE_KERNEL)
+        _, noise_std = cv2.meanStdDev(noise)
+        noise_level = np.float64(noise_std[0, 0])
+        noise_score = min(noise_level / 30.0, 1.0)
+        
+        # Compression: batched DCT over the same blocks as the per-block loop
+        h, w = gray.shape
+        rows, cols = len(range(0, h - 8, 8)), len(range(0, w - 8, 8))
+        if rows and cols:
+            dct_blocks = block_dct(gray[:rows * 8, :cols * 8].astype(np.float32))
+            high_freq = np.abs(dct_blocks[:, :, 4:, 4:]).sum(axis=(-2, -1), dtype=np.float32)
+            compression_artifacts = np.std(high_freq.ravel())
+            compression_score = max(0, 1 - (compression_artifacts / 100.0))
+        else:
+            compression_artifacts = 0
+            compression_score = 0.5
+        
+        resolution_score, resolution_category, dimensions = self.calculate_resolution_quality(image)
+        
+        # Color: per-channel variance in one pass
+        if len(image.shape) == 3:
+            _, stddev = cv2.meanStdDev(image)
+            color_vars = stddev.ravel()[:3] ** 2
+            avg_color_var = np.mean(color_vars)
+            color_score = min(avg_color_var / 2000.0, 1.0)
+            color_consistency = 1.0 - (np.std(color_vars) / max(np.mean(color_vars), 1))
+        else:
+            color_score, color_consistency = 0.5, "Grayscale"
+        
+        return {
+            "blur": (blur_score, laplacian_var),
+            "sharpness": (sharpness_score, sharpness),
+            "noise": (noise_score, noise_level),
+            "compression": (compression_score, compression_artifacts),
+            "resolution": (resolution_score, resolution_category, dimensions),
+            "color": (color_score, color_consistency)
+        }
+    
+    def _tile_sums(self, values, tile_size, squares=False):
+        """Per-tile sums (and sums of squares) from integral images"""
+        rows, cols = values.shape[0] // tile_size, values.shape[1] // tile_size
+        grid = (slice(0, rows * tile_size + 1, tile_size), slice(0, cols * tile_size + 1, tile_size))
+        
+        def box(integral):
+            corners = integral[grid]
+            return corners[1:, 1:] - corners[:-1, 1:] - corners[1:, :-1] + corners[:-1, :-1]
+        
+        if squares:
+            total, squared = cv2.integral2(values, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+            return box(total), box(squared)
+        return box(cv2.integral(values, sdepth=cv2.CV_64F))
+    
+    def compute_quality_maps(self, image, tile_size=64, z_threshold=3.5):
+        """Per-tile blur, gradient energy and noise maps plus an inconsistency score"""
+        if tile_size < 4 or tile_size % 2:
+            # The noise map tiles the half-resolution Haar subband in tile_size // 2 steps
+            raise ValueError(f"tile_size must be an even number >= 4, got {tile_size}")
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY) if len(image.shape) == 3 else image
+        rows, cols = gray.shape[0] // tile_size, gray.shape[1] // tile_size
+        if rows < 2 or cols < 2:
+            return None
+        
+        area = float(tile_size * tile_size)
+        laplacian = cv2.Laplacian(gray, cv2.CV_32F)
+        lap_sum, lap_sq = self._tile_sums(laplacian, tile_size, squares=True)
+        laplacian_var = lap_sq / area - (lap_sum / area) ** 2
+        
+        grad_x = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=3)
+        grad_y = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=3)
+        gradient_energy = self._tile_sums(grad_x * grad_x + grad_y * grad_y, tile_size) / area
+        
+        _, noise_sigma = estimate_noise(gray, tile_size)
+        noise_sigma = noise_sigma[:rows, :cols]
+        
+        # Laplacian variance relative to gradient energy is a content-normalized
+        # sharpness: blurring removes fine detail faster than edges, while flat
+        # or noisy tiles score high. Featureless tiles are left out.
+        textured = gradient_energy > 25.0
+        sharpness_ratio = np.log((laplacian_var + 1.0) / (gradient_energy + 1.0))
+        log_noise = np.log(noise_sigma + 0.5)
+        
+        def robust_z(values, mask):
+            if np.count_nonzero(mask) < 4:
+                return np.zeros_like(values)
+            center = np.median(values[mask])
+            # Spread floor of 0.2 in log units ignores variations below ~20%
+            spread = max(1.4826 * np.median(np.abs(values[mask] - center)), 0.2)
+            return np.where(mask, (values - center) / spread, 0.0)
+        
+        blur_z = robust_z(sharpness_ratio, textured)
+        noise_z = robust_z(log_noise, np.ones_like(textured))
+        
+        # Smooth content (sky, skin, walls) is naturally clean after JPEG, so
+        # missing noise only counts on textured tiles
+        noise_z = np.where(textured | (noise_z > 0), noise_z, 0.0)
+        
+        suspicious = []
+        for (r, c) in zip(*np.nonzero((blur_z < -z_threshold) | (np.abs(noise_z) > z_threshold))):
+            reasons = []
+            if blur_z[r, c] < -z_threshold:
+                reasons.append("blurrier than surroundings")
+            if noise_z[r, c] > z_threshold:
+                reasons.append("noisier than surroundings")
+            elif noise_z[r, c] < -z_threshold:
+                reasons.append("cleaner than surroundings")
+            suspicious.append(((int(r * tile_size), int(c * tile_size)), ", ".join(reasons)))
+        
+        inconsistency = min(len(suspicious) / float(rows * cols) * 5.0, 1.0)
+        
+        return {
+            "tile_size": tile_size,
+            "grid": (rows, cols),
+            "laplacian_variance": laplacian_var.astype(np.float32),
+            "gradient_energy": gradient_energy.astype(np.float32),
+            "noise_sigma": noise_sigma,
+            "inconsistency": inconsistency,
+            "suspicious_tiles": suspicious
+        }
+    
+    def calculate_brisque_features(self, image):
+        """No-reference quality features (BRISQUE-style MSCN statistics)"""
+        return dict(zip(BRISQUE_FEATURE_NAMES, brisque_features(image).tolist()))
+    
+    def analyze_image_quality(self, image_path, include_brisque=False, tile_size=None):
         """Main analysis function focusing on image quality"""
         print(f"Analyzing image quality: {image_path}")
         
@@ -160,13 +306,39 @@ class QualityBasedTamperingDetector:
         if image is None:
             return {"error": "Could not load image"}
         
-        # Calculate various quality metrics
-        blur_score, blur_value = self.calculate_blur_metric(image)
-        sharpness_score, sharpness_value = self.calculate_sharpness_metric(image)
-        noise_score, noise_value = self.calculate_noise_level(image)
-        compression_score, compression_artifacts = self.calculate_compression_quality(image)
-        resolution_score, resolution_category, dimensions = self.calculate_resolution_quality(image)
-        color_score, color_consistency = self.calculate_color_quality(image)
+        # Calculate various quality metrics (fused engine, same values as calculate_*)
+        results = self.assess_quality(image_path, self.compute_quality_metrics(image))
+        
+        if tile_size:
+            maps = self.compute_quality_maps(image, tile_size)
+            if maps is not None:
+                results["tile_analysis"] = {
+                    "tile_size": tile_size,
+                    "grid": maps["grid"],
+                    "inconsistency_score": round(maps["inconsistency"], 3),
+                    "suspicious_tiles": maps["suspicious_tiles"][:10]
+                }
+                # Regional inconsistency localizes edits that global metrics average out
+                assessment = results["tampering_assessment"]
+                if maps["inconsistency"] > max(0.5, assessment["tampering_probability"]):
+                    assessment["tampering_probability"] = round(maps["inconsistency"], 3)
+                    assessment["verdict"] = "Possibly Tampered (Inconsistent Regional Quality)"
+                    assessment["risk_level"] = "High" if maps["inconsistency"] > 0.7 else "Medium"
+        
+        if include_brisque:
+            results["brisque_features"] = {name: round(value, 5) for name, value in
+                                           self.calculate_brisque_features(image).items()}
+        
+        return results
+    
+    def assess_quality(self, image_path, metrics):
+        """Turn compute_quality_metrics output into the analysis results dict"""
+        blur_score, blur_value = metrics["blur"]
+        sharpness_score, sharpness_value = metrics["sharpness"]
+        noise_score, noise_value = metrics["noise"]
+        compression_score, compression_artifacts = metrics["compression"]
+        resolution_score, resolution_category, dimensions = metrics["resolution"]
+        color_score, color_consistency = metrics["color"]
         
         # Calculate overall quality score
         quality_weights = {
@@ -258,6 +430,101 @@ class QualityBasedTamperingDetector:
         
         return results
     
+    def compute_quality_metrics_batch(self, images):
+        """Batched compute_quality_metrics for an (N, H, W, 3) uint8 stack"""
+        images = np.asarray(images)
+        n, h, w = images.shape[:3]
+        if images.ndim == 4:
+            gray = cv2.cvtColor(images.reshape(n * h, w, images.shape[3]), cv2.COLOR_RGB2GRAY).reshape(n, h, w)
+        else:
+            gray = images
+        
+        # Filter the whole stack as one tall image. Each image gets a
+        # reflect-101 row above and below (OpenCV's default border), so rows
+        # never mix across images and the padding rows are dropped afterwards.
+        stack = np.pad(gray, ((0, 0), (1, 1), (0, 0)), mode='reflect').reshape(n * (h + 2), w)
+        
+        def unstack(filtered):
+            return filtered.reshape(n, h + 2, w)[:, 1:-1]
+        
+        laplacian = unstack(cv2.Laplacian(stack, cv2.CV_32F))
+        gradient = unstack(cv2.magnitude(cv2.Sobel(stack, cv2.CV_32F, 1, 0, ksize=3),
+                                         cv2.Sobel(stack, cv2.CV_32F, 0, 1, ksize=3)))
+        noise = unstack(cv2.filter2D(stack, -1, self.NOISE_KERNEL))
+        
+        # Compression: only the high-frequency 4x4 corner of every block DCT
+        rows, cols = len(range(0, h - 8, 8)), len(range(0, w - 8, 8))
+        if rows and cols:
+            blocks = gray[:, :rows * 8, :cols * 8].astype(np.float32)
+            blocks = blocks.reshape(n, rows, 8, cols, 8).swapaxes(-3, -2)
+            high = DCT8[4:]
+            high_freq = np.abs(high @ blocks @ high.T).sum(axis=(-2, -1), dtype=np.float32)
+            artifacts = np.std(high_freq.reshape(n, -1), axis=1)
+        
+        resolution = self.calculate_resolution_quality(images[0])
+        
+        batch_metrics = []
+        for k in range(n):
+            # Per-image reductions are single OpenCV calls with double accumulators
+            laplacian_var = np.float64(cv2.meanStdDev(laplacian[k])[1][0, 0] ** 2)
+            sharpness = np.float64(cv2.mean(gradient[k])[0])
+            noise_level = np.float64(cv2.meanStdDev(noise[k])[1][0, 0])
+            
+            if rows and cols:
+                compression = (max(0, 1 - (artifacts[k] / 100.0)), artifacts[k])
+            else:
+                compression = (0.5, 0)
+            
+            if images.ndim == 4:
+                color_vars = cv2.meanStdDev(images[k])[1].ravel()[:3] ** 2
+                avg_color_var = np.mean(color_vars)
+                color = (min(avg_color_var / 2000.0, 1.0),
+                         1.0 - (np.std(color_vars) / max(np.mean(color_vars), 1)))
+            else:
+                color = (0.5, "Grayscale")
+            
+            batch_metrics.append({
+                "blur": (min(laplacian_var / 500.0, 1.0), laplacian_var),
+                "sharpness": (min(sharpness / 50.0, 1.0), sharpness),
+                "noise": (min(noise_level / 30.0, 1.0), noise_level),
+                "compression": compression,
+                "resolution": resolution,
+                "color": color
+            })
+        
+        return batch_metrics
+    
+    def score_batch(self, images, chunk_size=64):
+        """Score an (N, H, W, 3) stack or a list of paths; one result per input
+        
+        Paths are loaded chunk by chunk and grouped by size so each group is
+        scored with a single batched pass of compute_quality_metrics_batch.
+        """
+        if isinstance(images, np.ndarray):
+            results = []
+            for start in range(0, len(images), chunk_size):
+                chunk = images[start:start + chunk_size]
+                metrics = self.compute_quality_metrics_batch(chunk)
+                results.extend(self.assess_quality(f"image_{start + k}", m) for k, m in enumerate(metrics))
+            return results
+        
+        results = [None] * len(images)
+        for start in range(0, len(images), chunk_size):
+            groups = {}
+            for index in range(start, min(start + chunk_size, len(images))):
+                image = self.load_image(images[index])
+                if image is None:
+                    results[index] = {"error": "Could not load image"}
+                    continue
+                groups.setdefault(image.shape, []).append((index, image))
+            
+            for members in groups.values():
+                metrics = self.compute_quality_metrics_batch(np.stack([image for _, image in members]))
+                for (index, _), m in zip(members, metrics):
+                    results[index] = self.assess_quality(images[index], m)
+        
+        return results
+    
     def get_quality_assessment(self, quality_score):
         """Get human-readable quality assessment"""
         if quality_score >= 0.8:
@@ -329,8 +596,11 @@ def main():
     parser = argparse.ArgumentParser(description='Quality-based image tampering detection')
     parser.add_argument('image_path', nargs='?', help='Path to the image file to analyze')
     parser.add_argument('--output', '-o', help='Output file to save results (JSON format)')
+    parser.add_argument('--tiles', type=int, metavar='SIZE', help='Also compute per-tile quality maps with this tile size')
     
     args = parser.parse_args()
+    if args.tiles is not None and (args.tiles < 4 or args.tiles % 2):
+        parser.error(f"--tiles must be an even number >= 4, got {args.tiles}")
     
     detector = QualityBasedTamperingDetector()
     
@@ -340,7 +610,7 @@ def main():
             print(f"Error: Image file '{args.image_path}' not found!")
             sys.exit(1)
         
-        results = detector.analyze_image_quality(args.image_path)
+        results = detector.analyze_image_quality(args.image_path, tile_size=args.tiles)
         detector.print_detailed_results(results)
         
         if args.output:
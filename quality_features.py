@@ -0,0 +1,154 @@
+import cv2
+import numpy as np
+from scipy.special import gamma
+from texture_features import texture_proxy
+
+# No-reference image quality features in the style of BRISQUE (Mittal et al.).
+# Natural images have mean-subtracted contrast-normalized (MSCN) coefficients
+# that follow a generalized Gaussian; editing, resampling and compression
+# change its shape. Parameters are fitted by moment matching against a
+# precomputed gamma-ratio table, so no per-image optimisation is needed.
+# Large images are first reduced by an integer factor to a proxy whose long
+# side is at most PROXY_MAX_SIDE, so the cost no longer grows with the
+# camera resolution.
+
+# Bumped whenever the feature values change for some input
+QUALITY_FEATURE_VERSION = 2
+PROXY_MAX_SIDE = 1024
+# Smallest proxy side with a usable half scale (products need two rows there)
+MIN_SIDE = 16
+
+MSCN_SIGMA = 7.0 / 6.0
+MSCN_KERNEL = cv2.getGaussianKernel(7, MSCN_SIGMA, cv2.CV_32F)
+MSCN_C = 1.0
+
+# Moment ratio r(alpha) = G(1/a) G(3/a) / G(2/a)^2, monotonically decreasing
+_ALPHAS = np.arange(0.2, 10.0, 0.001)
+_RATIOS = gamma(1.0 / _ALPHAS) * gamma(3.0 / _ALPHAS) / gamma(2.0 / _ALPHAS) ** 2
+
+PAIR_ORIENTATIONS = ("horizontal", "vertical", "diagonal", "antidiagonal")
+# (row, col) offsets of the two factors of each neighbour product, same order
+PAIR_SHIFTS = (((0, 0), (0, 1)), ((0, 0), (1, 0)), ((0, 0), (1, 1)), ((0, 1), (1, 0)))
+# Rows per band when reducing moments; a band's scratch buffers stay in L2
+MOMENT_BAND_ROWS = 64
+FEATURE_NAMES = [
+    f"scale{scale}_{name}"
+    for scale in (1, 2)
+    for name in (["mscn_alpha", "mscn_variance"] +
+                 [f"{o}_{p}" for o in PAIR_ORIENTATIONS
+                  for p in ("alpha", "mean", "left_variance", "right_variance")])
+]
+
+
+def _alpha_from_ratio(ratio):
+    """Invert r(alpha) by interpolation on the precomputed table"""
+    return np.interp(ratio, _RATIOS[::-1], _ALPHAS[::-1])
+
+
+def mscn_coefficients(gray):
+    """MSCN coefficients of a grayscale image (float32)"""
+    x = gray.astype(np.float32)
+    mu = cv2.sepFilter2D(x, -1, MSCN_KERNEL, MSCN_KERNEL, borderType=cv2.BORDER_REPLICATE)
+    sigma = cv2.multiply(x, x)
+    cv2.sepFilter2D(sigma, -1, MSCN_KERNEL, MSCN_KERNEL, dst=sigma, borderType=cv2.BORDER_REPLICATE)
+    # In place from here on: every fresh 2 MP temporary costs as much as the arithmetic
+    cv2.subtract(x, mu, dst=x)
+    cv2.multiply(mu, mu, dst=mu)
+    cv2.absdiff(sigma, mu, dst=sigma)
+    cv2.sqrt(sigma, dst=sigma)
+    cv2.add(sigma, MSCN_C, dst=sigma)
+    return cv2.divide(x, sigma, dst=x)
+
+
+def _sums(x):
+    """(sum, sum of squares) of a float32 array in one pass"""
+    mean, std = cv2.meanStdDev(x)
+    mean, std = mean[0, 0], std[0, 0]
+    return x.size * mean, x.size * (std * std + mean * mean)
+
+
+def _moments(x, positive):
+    """[n_left, n_right, sum_sq_left, sum_sq_right, sum_abs] of x; positive is scratch"""
+    # Only the positive part is materialized; left-side sums follow by difference
+    n_nonzero = cv2.countNonZero(x)
+    total, sum_sq = _sums(x)
+    cv2.max(x, 0, dst=positive)
+    n_right = cv2.countNonZero(positive)
+    sum_right, sum_sq_right = _sums(positive)
+    return np.array([n_nonzero - n_right, n_right, sum_sq - sum_sq_right, sum_sq_right,
+                     2 * sum_right - total])
+
+
+def fit_ggd(moments, n):
+    """Symmetric generalized Gaussian fit from one _moments row: (alpha, variance)"""
+    _, _, sum_sq_left, sum_sq_right, sum_abs = moments
+    variance = (sum_sq_left + sum_sq_right) / n
+    alpha = _alpha_from_ratio(variance / max((sum_abs / n) ** 2, 1e-12))
+    return float(alpha), float(variance)
+
+
+def fit_aggd(moments, n):
+    """Asymmetric generalized Gaussian fit, vectorized over rows of _moments tuples"""
+    n_left, n_right, sum_sq_left, sum_sq_right, sum_abs = np.asarray(moments, np.float64).T
+    left_var = sum_sq_left / np.maximum(n_left, 1)
+    right_var = sum_sq_right / np.maximum(n_right, 1)
+    left_std = np.sqrt(left_var)
+    right_std = np.sqrt(right_var)
+    gamma_hat = left_std / np.maximum(right_std, 1e-12)
+
+    r_hat = (sum_abs / n) ** 2 / np.maximum((sum_sq_left + sum_sq_right) / n, 1e-12)
+    rho = r_hat * (gamma_hat ** 3 + 1) * (gamma_hat + 1) / (gamma_hat ** 2 + 1) ** 2
+
+    alpha = _alpha_from_ratio(1.0 / np.maximum(rho, 1e-12))
+    mean = (right_std - left_std) * gamma(2.0 / alpha) / gamma(1.0 / alpha) * \
+        np.sqrt(gamma(1.0 / alpha) / gamma(3.0 / alpha))
+    return np.stack([alpha, mean, left_var, right_var], axis=1)
+
+
+def _scale_features(gray):
+    """18 features of one scale: MSCN GGD + AGGD of 4 neighbour products"""
+    mscn = mscn_coefficients(gray)
+    h, w = mscn.shape
+    product = np.empty((MOMENT_BAND_ROWS, w - 1), np.float32)
+    positive = np.empty((MOMENT_BAND_ROWS, w), np.float32)
+    ggd = np.zeros(5)
+    aggd = np.zeros((len(PAIR_SHIFTS), 5))
+
+    # Moments are accumulated band by band so each product and its positive
+    # part are reduced while still in cache, instead of five passes over 2 MP
+    for top in range(0, h, MOMENT_BAND_ROWS):
+        bottom = min(top + MOMENT_BAND_ROWS, h)
+        ggd += _moments(mscn[top:bottom], positive[:bottom - top])
+
+        # Products pair each row with the one below; the last row is only a lower factor
+        rows = min(bottom, h - 1) - top
+        if rows <= 0:
+            continue
+        for i, ((ya, xa), (yb, xb)) in enumerate(PAIR_SHIFTS):
+            cv2.multiply(mscn[top + ya:top + ya + rows, xa:xa + w - 1],
+                         mscn[top + yb:top + yb + rows, xb:xb + w - 1], dst=product[:rows])
+            aggd[i] += _moments(product[:rows], positive[:rows, :w - 1])
+
+    features = list(fit_ggd(ggd, mscn.size))
+    features.extend(fit_aggd(aggd, (h - 1) * (w - 1)).ravel())
+    return features
+
+
+def brisque_features(image):
+    """36-dim BRISQUE-style feature vector (two scales) as float32
+
+    Images too small for the half scale, and constant images, have no MSCN
+    statistics to fit; they get all-zero features rather than NaNs.
+    """
+    if len(image.shape) == 3:
+        gray = cv2.cvtColor(image[:, :, :3], cv2.COLOR_RGB2GRAY)
+    else:
+        gray = image
+
+    gray = texture_proxy(gray, PROXY_MAX_SIDE)
+    if min(gray.shape[:2]) < MIN_SIDE or gray.min() == gray.max():
+        return np.zeros(len(FEATURE_NAMES), np.float32)
+
+    half = cv2.resize(gray, (gray.shape[1] // 2, gray.shape[0] // 2), interpolation=cv2.INTER_AREA)
+    features = _scale_features(gray) + _scale_features(half)
+    return np.asarray(features, dtype=np.float32)
@@ -6,6 +6,8 @@ from tkinter import filedialog, messagebox, ttk
 from PIL import Image, ImageTk
 import json
 from ml_tampering_detector import MLTamperingDetector
+from feature_store import FeatureStore
+from model_manager import ModelManager
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
@@ -16,9 +18,10 @@ class RealTimeTamperingDetectorApp:
         self.root.geometry("1200x800")
         self.root.configure(bg='#f0f0f0')
         
-        # Initialize the ML detector
-        self.detector = MLTamperingDetector()
+        # The model manager serves the current detector and hot-swaps retrained bundles
+        self.model_manager = ModelManager(detector_factory=lambda: MLTamperingDetector(feature_store=FeatureStore()))
         self.models_loaded = False
+        self.model_generation = 0
         
         # Variables
         self.current_image_path = None
@@ -26,6 +29,12 @@ class RealTimeTamperingDetectorApp:
         
         self.setup_ui()
         self.load_models()
+        self.model_manager.start()
+        self.root.after(1000, self.poll_model_updates)
+    
+    @property
+    def detector(self):
+        return self.model_manager.detector
     
     def setup_ui(self):
         """Setup the user interface"""
@@ -171,16 +180,27 @@ class RealTimeTamperingDetectorApp:
         """Load pre-trained models"""
         self.update_status("Loading models...")
         try:
-            if self.detector.load_models():
+            self.model_manager.check_for_update()
+            self.model_generation = self.model_manager.generation
+            if self.detector is not None:
                 self.models_loaded = True
                 self.update_status("Models loaded successfully!")
             else:
                 self.models_loaded = False
-                self.update_status("No trained models found. Please train first.")
+                self.update_status(self.model_manager.last_error and f"Error loading models: {self.model_manager.last_error}"
+                                   or "No trained models found. Please train first.")
         except Exception as e:
             self.models_loaded = False
             self.update_status(f"Error loading models: {str(e)}")
     
+    def poll_model_updates(self):
+        """Report models hot-swapped by the background watcher (runs on the Tk thread)"""
+        if self.model_manager.generation != self.model_generation:
+            self.model_generation = self.model_manager.generation
+            self.models_loaded = True
+            self.update_status(f"New models loaded (generation {self.model_generation})")
+        self.root.after(1000, self.poll_model_updates)
+    
     def load_image(self):
         """Load an image file"""
         file_types = [
@@ -331,10 +351,16 @@ class RealTimeTamperingDetectorApp:
         """Perform the actual model training"""
         try:
             # Train models
-            results = self.detector.train_models()
+            def on_progress(done, total):
+                self.update_status(f"Extracting features... {done}/{total}")
+            
+            # Train a fresh detector; the saved bundle is validated and swapped in
+            trainer = self.model_manager.detector_factory()
+            results = trainer.train_models(progress_callback=on_progress)
+            self.model_manager.check_for_update()
             
             self.progress.stop()
-            self.models_loaded = True
+            self.models_loaded = self.detector is not None
             self.update_status("Models trained successfully!")
             
             # Show training results
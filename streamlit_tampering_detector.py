@@ -14,6 +14,10 @@ except ImportError:
     subprocess.check_call([sys.executable, "-m", "pip", "install", "opencv-python-headless"])
     import cv2
 
+from face_analysis import get_face_detector, FaceROIAnalyzer
+from face_analysis import detect_faces as find_faces
+from metadata_analysis import check_thumbnail_consistency
+
 # Page configuration
 st.set_page_config(
     page_title="🔍 Image Tampering Detection",
@@ -40,40 +44,21 @@ def extract_exif_data(image):
 def detect_faces(image_array):
     """Detect faces in the image using OpenCV"""
     try:
-        if not hasattr(cv2, 'data'):
-            st.warning("OpenCV data files not available. Face detection will be limited.")
+        # Detector is loaded once per process and runs on a downscaled proxy
+        kind, model = get_face_detector()
+        if model is None:
+            st.warning("Could not load face detection model. Face detection will be skipped.")
             return False, []
-            
-        # Convert to grayscale for face detection
-        gray = cv2.cvtColor(image_array, cv2.COLOR_BGR2GRAY)
         
-        # Try to load the pre-trained face detector
-        try:
-            face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-            if face_cascade.empty():
-                st.warning("Could not load face detection model. Face detection will be skipped.")
-                return False, []
-                
-            # Detect faces
-            faces = face_cascade.detectMultiScale(
-                gray,
-                scaleFactor=1.1,
-                minNeighbors=5,
-                minSize=(30, 30)
-            )
-            
-            return len(faces) > 0, faces
-            
-        except Exception as e:
-            st.warning(f"Face detection not available: {str(e)}")
-            return False, []
-            
+        faces = find_faces(image_array)
+        return len(faces) > 0, faces
+        
     except Exception as e:
         st.warning(f"Error in face detection: {str(e)}")
         return False, []
 
 
-def analyze_image_tampering(image, image_path, image_format):
+def analyze_image_tampering(image, image_path, image_format, image_bytes=None):
     """Analyze image for tampering indicators and return detailed explanation"""
     results = {
         'is_tampered': False,
@@ -118,6 +103,18 @@ def analyze_image_tampering(image, image_path, image_format):
     else:
         results['reasons'].append(f"✅ Creation date available: {exif_dict['DateTime']}")
     
+    # 4b. Embedded EXIF thumbnail should still show the same picture
+    if image_bytes is not None:
+        thumbnail = check_thumbnail_consistency(image_bytes)
+        if 'error' in thumbnail:
+            results['reasons'].append(f"⚠️ EXIF thumbnail present but the main image is damaged ({thumbnail['error']}) - Could not compare them")
+        elif thumbnail['has_thumbnail'] and not thumbnail['consistent']:
+            results['is_tampered'] = True
+            results['confidence_score'] += 35
+            results['reasons'].append(f"⚠️ EXIF thumbnail differs from the image (hash distance {thumbnail['phash_distance']}, SSIM {thumbnail['ssim']:.2f}) - The picture was changed after capture")
+        elif thumbnail['has_thumbnail']:
+            results['reasons'].append("✅ EXIF thumbnail matches the image content")
+    
     # 5. Image format analysis
     if image_format.lower() in ['png']:
         results['is_tampered'] = True
@@ -127,10 +124,18 @@ def analyze_image_tampering(image, image_path, image_format):
         results['reasons'].append("✅ JPEG format - More common in original digital photos")
 
     # 6. Face detection for potential manipulation
-    image_array = np.array(image)
+    image_array = np.array(image.convert('RGB'))
     has_faces, faces = detect_faces(image_array)
     if has_faces and len(faces) > 0:
-        results['reasons'].append(f"✅ {len(faces)} face(s) detected - No obvious signs of face manipulation")
+        # Forensic checks on the face regions against the rest of the image
+        face_results = FaceROIAnalyzer().analyze(image_array, faces)
+        face_score = face_results['confidence']
+        if face_score >= 0.5:
+            results['is_tampered'] = True
+            results['confidence_score'] += 20
+            results['reasons'].append(f"⚠️ {len(faces)} face(s) detected - Face region noise/compression differs from the background (score {face_score:.2f})")
+        else:
+            results['reasons'].append(f"✅ {len(faces)} face(s) detected - No obvious signs of face manipulation")
     else:
         results['reasons'].append("ℹ️ No faces detected - This is normal for landscape/object photos")
     
@@ -180,7 +185,7 @@ def main():
             
             # Perform analysis
             with st.spinner('Analyzing image for tampering indicators...'):
-                results = analyze_image_tampering(image, uploaded_file.name, uploaded_file.type)
+                results = analyze_image_tampering(image, uploaded_file.name, uploaded_file.type, uploaded_file.getvalue())
             
             # Display overall result
             if results['is_tampered']:
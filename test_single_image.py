@@ -9,6 +9,7 @@ def main():
     parser.add_argument('image_path', help='Path to the image file to analyze')
     parser.add_argument('--output', '-o', help='Output file to save results (JSON format)')
     parser.add_argument('--verbose', '-v', action='store_true', help='Verbose output')
+    parser.add_argument('--fast', action='store_true', help='Random forest only, via the NumPy export (skips loading sklearn)')
     
     args = parser.parse_args()
     
@@ -32,7 +33,7 @@ def main():
     
     # Analyze the image
     try:
-        result = detector.predict_image(args.image_path)
+        result = detector.predict_image(args.image_path, rf_only=args.fast)
         
         if "error" in result:
             print(f"Error: {result['error']}")
@@ -87,7 +88,15 @@ def print_results(result, verbose=False):
             print(f"  Prediction: {pred_data['prediction']}")
             print(f"  Confidence: {pred_data['confidence']:.3f}")
             print(f"  Tampered Probability: {pred_data['tampered_probability']:.3f}")
-    
+
+        if 'exemplars' in result:
+            print(f"\nMOST SIMILAR KNOWN IMAGES:")
+            print("-" * 30)
+            for label, neighbours in result['exemplars'].items():
+                print(f"\n{label.title()}:")
+                for neighbour in neighbours:
+                    print(f"  {neighbour['filename']} (distance {neighbour['distance']:.3f})")
+
     print(f"\nRECOMMENDATION:")
     if recommendation == "Tampered":
         print("⚠️  WARNING: This image shows signs of tampering!")
@@ -0,0 +1,91 @@
+import json
+import os
+import numpy as np
+import pytest
+from feature_store import FeatureStore, file_digest
+
+
+def _vectors(n, n_features=4, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, n_features)).astype(np.float32)
+
+
+def test_put_get_round_trip_survives_reopen(tmp_path):
+    store = FeatureStore(str(tmp_path))
+    vectors = _vectors(3)
+    store.put_many(["a", "b", "c"], "v1", vectors)
+    store.put("d", "v1", vectors[0] * 2)
+
+    for reopened in (store, FeatureStore(str(tmp_path))):
+        assert reopened.count("v1") == 4
+        np.testing.assert_array_equal(reopened.get("b", "v1"), vectors[1])
+        got = reopened.get_many(["c", "missing", "d"], "v1")
+        np.testing.assert_array_equal(got[0], vectors[2])
+        assert got[1] is None
+        np.testing.assert_array_equal(got[2], vectors[0] * 2)
+
+
+def test_existing_digests_are_not_appended_again(tmp_path):
+    store = FeatureStore(str(tmp_path))
+    vectors = _vectors(2)
+    store.put_many(["a", "b"], "v1", vectors)
+    store.put_many(["b", "c"], "v1", _vectors(2, seed=1))
+    assert store.count("v1") == 3
+    np.testing.assert_array_equal(store.get("b", "v1"), vectors[1])
+
+
+def test_versions_are_separate_and_check_width(tmp_path):
+    store = FeatureStore(str(tmp_path))
+    store.put("a", "v1", _vectors(1)[0])
+    store.put("a", "v2", _vectors(1, n_features=6)[0])
+    assert store.versions() == ["v1", "v2"]
+    assert store.get("a", "v2").shape == (6,)
+    with pytest.raises(ValueError):
+        store.put("b", "v1", _vectors(1, n_features=5)[0])
+
+
+def test_evict_removes_versions_and_files(tmp_path):
+    store = FeatureStore(str(tmp_path))
+    store.put("a", "old", _vectors(1)[0])
+    store.put("a", "new", _vectors(1)[0])
+    assert store.evict(["new"]) == ["old"]
+    assert store.get("a", "old") is None
+    assert not os.path.exists(tmp_path / "old.f32") and not os.path.exists(tmp_path / "old.rows")
+
+    reopened = FeatureStore(str(tmp_path))
+    assert reopened.versions() == ["new"]
+    assert reopened.get("a", "new") is not None
+
+
+def test_interrupted_append_is_ignored_and_overwritten(tmp_path):
+    store = FeatureStore(str(tmp_path))
+    vectors = _vectors(3)
+    store.put_many(["a", "b"], "v1", vectors[:2])
+    # A crash after the matrix write but mid-way through the log line
+    with open(tmp_path / "v1.rows", "a") as f:
+        f.write("c-partial")
+
+    reopened = FeatureStore(str(tmp_path))
+    assert reopened.count("v1") == 2
+    reopened.put("c", "v1", vectors[2])
+    assert FeatureStore(str(tmp_path)).count("v1") == 3
+    np.testing.assert_array_equal(FeatureStore(str(tmp_path)).get("c", "v1"), vectors[2])
+
+
+def test_legacy_index_is_migrated(tmp_path):
+    vectors = _vectors(2)
+    vectors.tofile(tmp_path / "v1.f32")
+    with open(tmp_path / "index.json", "w") as f:
+        json.dump({"v1": {"n_features": 4, "count": 2, "rows": {"a": 0, "b": 1}}}, f)
+
+    store = FeatureStore(str(tmp_path))
+    np.testing.assert_array_equal(store.get("b", "v1"), vectors[1])
+    with open(tmp_path / "index.json") as f:
+        assert json.load(f) == {"v1": {"n_features": 4}}
+
+
+def test_file_digest_follows_content(tmp_path):
+    (tmp_path / "x.bin").write_bytes(b"same")
+    (tmp_path / "y.bin").write_bytes(b"same")
+    (tmp_path / "z.bin").write_bytes(b"other")
+    assert file_digest(str(tmp_path / "x.bin")) == file_digest(str(tmp_path / "y.bin"))
+    assert file_digest(str(tmp_path / "x.bin")) != file_digest(str(tmp_path / "z.bin"))
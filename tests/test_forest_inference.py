@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+from forest_inference import CompactForest
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    X, y = make_classification(n_samples=300, n_features=12, n_informative=6, random_state=0)
+    X = X * 50 + 10
+    scaler = StandardScaler().fit(X)
+    rf = RandomForestClassifier(n_estimators=25, random_state=0).fit(scaler.transform(X), y)
+    X_new, _ = make_classification(n_samples=200, n_features=12, n_informative=6, random_state=1)
+    return scaler, rf, X_new * 50 + 10
+
+
+def test_probabilities_match_sklearn_exactly(fitted):
+    scaler, rf, X = fitted
+    forest = CompactForest.from_sklearn(rf, scaler, "v-test")
+    np.testing.assert_array_equal(forest.predict_proba(X), rf.predict_proba(scaler.transform(X)))
+    np.testing.assert_array_equal(forest.predict_proba_scaled(scaler.transform(X)),
+                                  rf.predict_proba(scaler.transform(X)))
+    np.testing.assert_array_equal(forest.classes_, rf.classes_)
+
+
+def test_shallow_and_string_class_forests_match(fitted):
+    scaler, _, X = fitted
+    y = np.where(np.arange(len(X)) % 3 == 0, "tampered", "original")
+    rf = RandomForestClassifier(n_estimators=7, max_depth=3, random_state=0).fit(scaler.transform(X), y)
+    forest = CompactForest.from_sklearn(rf, scaler, "v-test")
+    np.testing.assert_array_equal(forest.predict_proba(X), rf.predict_proba(scaler.transform(X)))
+    assert list(forest.classes_) == ["original", "tampered"]
+
+
+def test_save_load_round_trip(tmp_path, fitted):
+    scaler, rf, X = fitted
+    path = str(tmp_path / "forest.npz")
+    CompactForest.from_sklearn(rf, scaler, "v-test", bundle_id="abc").save(path)
+
+    loaded = CompactForest.load(path)
+    assert loaded.feature_version == "v-test"
+    assert loaded.bundle_id == "abc"
+    np.testing.assert_array_equal(loaded.predict_proba(X), rf.predict_proba(scaler.transform(X)))
+    CompactForest.from_sklearn(rf, scaler, "v-test").save(path)
+    assert CompactForest.load(path).bundle_id is None
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+from PIL import Image
+from metadata_analysis import estimate_jpeg_quality, extract_metadata
+
+
+@pytest.fixture
+def noise_image():
+    rng = np.random.default_rng(0)
+    return Image.fromarray(rng.integers(0, 256, (64, 64, 3), dtype=np.uint8))
+
+
+@pytest.mark.parametrize("quality", [5, 10, 25, 50, 75, 90, 95, 100])
+def test_jpeg_quality_matches_encoder_setting(tmp_path, noise_image, quality):
+    path = tmp_path / f"q{quality}.jpg"
+    noise_image.save(path, quality=quality)
+    assert extract_metadata(str(path))["jpeg_quality"] == quality
+
+
+def test_jpeg_quality_without_tables():
+    assert estimate_jpeg_quality(None) is None
+    assert estimate_jpeg_quality({}) is None
+
+
+def test_png_has_no_jpeg_quality(tmp_path, noise_image):
+    path = tmp_path / "image.png"
+    noise_image.save(path)
+    assert extract_metadata(str(path))["jpeg_quality"] is None
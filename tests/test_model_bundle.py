@@ -0,0 +1,36 @@
+import os
+import joblib
+import numpy as np
+from model_bundle import ModelBundle, save_bundle
+
+
+def test_models_load_one_at_a_time(tmp_path):
+    path = str(tmp_path / "bundle.joblib")
+    save_bundle(path, {"a": np.arange(3), "b": {"x": 1}}, {"feature_version": "v1"})
+
+    bundle = ModelBundle(path)
+    assert bundle.metadata["feature_version"] == "v1"
+    assert sorted(bundle.model_names()) == ["a", "b"]
+    assert bundle._models == {}
+    np.testing.assert_array_equal(bundle.get("a"), np.arange(3))
+    assert list(bundle._models) == ["a"]
+
+
+def test_only_current_and_previous_model_files_are_kept(tmp_path):
+    path = str(tmp_path / "bundle.joblib")
+    files = []
+    for generation in range(3):
+        save_bundle(path, {"a": [generation]}, {})
+        files.append(ModelBundle(path).model_files()[0])
+
+    assert sorted(f for f in os.listdir(tmp_path) if f != "bundle.joblib") == sorted(files[1:])
+    assert ModelBundle(path).get("a") == [2]
+
+
+def test_format_1_bundles_are_still_read(tmp_path):
+    path = str(tmp_path / "bundle.joblib")
+    joblib.dump({"format_version": 1, "metadata": {"feature_version": "v1"}, "models": {"a": 5}}, path)
+    bundle = ModelBundle(path)
+    assert bundle.metadata == {"feature_version": "v1"}
+    assert bundle.get("a") == 5
+    assert bundle.model_files() == []
@@ -0,0 +1,96 @@
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from ml_tampering_detector import MLTamperingDetector
+from model_bundle import ModelBundle, BUNDLE_FILENAME
+from model_manager import ModelManager
+
+
+def _save_trained(models_dir, **training_info):
+    """Fit small models on random features of the right width and save them as a bundle"""
+    detector = MLTamperingDetector()
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(40, len(detector.feature_names)))
+    y = np.tile([0, 1], 20)
+    X_scaled = detector.scaler.fit_transform(X)
+    detector.rf_model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X_scaled, y)
+    detector.svm_model.fit(X_scaled, y)
+    detector.training_info = dict(training_info)
+    detector.save_models(str(models_dir))
+    return detector
+
+
+class FixedProbabilityDetector(MLTamperingDetector):
+    """Scores every image with the tampered probability recorded in its bundle"""
+
+    def predict_images(self, images, n_workers=None, progress_callback=None, rf_only=False, exemplars=3):
+        probability = self.training_info["canary_probability"]
+        return [{"predictions": {"ensemble": {"tampered_probability": probability}}} for _ in images]
+
+
+@pytest.fixture
+def manager(tmp_path):
+    _save_trained(tmp_path)
+    # An empty canary folder: validation only loads the models
+    manager = ModelManager(str(tmp_path), canary_dir=str(tmp_path / "canary"))
+    assert manager.check_for_update()
+    return manager
+
+
+def test_unchanged_bundle_is_not_reloaded(manager):
+    assert not manager.check_for_update()
+    assert manager.generation == 1
+
+
+def test_garbage_bundle_is_rejected(manager, tmp_path):
+    serving = manager.detector
+    (tmp_path / BUNDLE_FILENAME).write_bytes(b"not a model bundle")
+    assert not manager.check_for_update()
+    assert manager.detector is serving and manager.generation == 1
+    assert manager.last_error
+
+
+def test_truncated_model_file_is_rejected(manager, tmp_path):
+    serving = manager.detector
+    _save_trained(tmp_path)
+    bundle = ModelBundle(str(tmp_path / BUNDLE_FILENAME))
+    svm_path = tmp_path / dict(zip(bundle.model_names(), bundle.model_files()))["svm_model"]
+    svm_path.write_bytes(svm_path.read_bytes()[:100])
+
+    assert not manager.check_for_update()
+    assert manager.detector is serving and manager.generation == 1
+
+
+def test_bundle_for_other_features_is_rejected(manager, tmp_path):
+    serving = manager.detector
+    bundle_path = str(tmp_path / BUNDLE_FILENAME)
+    payload = joblib.load(bundle_path)
+    payload["metadata"]["feature_version"] = "v0"
+    joblib.dump(payload, bundle_path)
+
+    assert not manager.check_for_update()
+    assert manager.detector is serving
+
+
+def test_valid_bundle_replaces_rejected_one(manager, tmp_path):
+    (tmp_path / BUNDLE_FILENAME).write_bytes(b"not a model bundle")
+    assert not manager.check_for_update()
+    _save_trained(tmp_path)
+    assert manager.check_for_update()
+    assert manager.generation == 2 and manager.last_error is None
+
+
+def test_canary_regression_is_rejected(tmp_path):
+    canary = [("tampered_1.jpg", 1), ("tampered_2.jpg", 1)]
+    _save_trained(tmp_path, canary_probability=0.9)
+    manager = ModelManager(str(tmp_path), detector_factory=FixedProbabilityDetector, canary=canary)
+    assert manager.check_for_update()
+
+    _save_trained(tmp_path, canary_probability=0.1)
+    assert not manager.check_for_update()
+    assert "served model" in manager.last_error
+
+    _save_trained(tmp_path, canary_probability=0.8)
+    assert manager.check_for_update()
+    assert manager.generation == 2
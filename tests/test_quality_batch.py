@@ -0,0 +1,59 @@
+import cv2
+import numpy as np
+import pytest
+from quality_based_detector import QualityBasedTamperingDetector
+
+
+def _images(n, h=96, w=128, seed=0):
+    """Smooth gradients with noise and a sharp block, so every metric is non-trivial"""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:h, 0:w]
+    images = []
+    for k in range(n):
+        base = np.stack([xx * 2 + k * 10, yy * 2, (xx + yy) + k * 5], axis=-1).astype(np.float64)
+        base += rng.normal(0, 4 + 3 * k, base.shape)
+        base[h // 4:h // 2, w // 4:w // 2] = 255 * (k % 2)
+        images.append(np.clip(base, 0, 255).astype(np.uint8))
+    return np.stack(images)
+
+
+def _assert_same_metrics(batch, single):
+    assert batch.keys() == single.keys()
+    for name in single:
+        for b, s in zip(batch[name], single[name]):
+            if isinstance(s, str):
+                assert b == s
+            else:
+                assert b == pytest.approx(s, rel=1e-6, abs=1e-9), name
+
+
+@pytest.fixture(scope="module")
+def detector():
+    return QualityBasedTamperingDetector()
+
+
+def test_batch_matches_single_image_rgb(detector):
+    images = _images(4)
+    for batch, image in zip(detector.compute_quality_metrics_batch(images), images):
+        _assert_same_metrics(batch, detector.compute_quality_metrics(image))
+
+
+def test_batch_matches_single_image_gray(detector):
+    images = np.stack([cv2.cvtColor(image, cv2.COLOR_RGB2GRAY) for image in _images(3, seed=1)])
+    for batch, image in zip(detector.compute_quality_metrics_batch(images), images):
+        _assert_same_metrics(batch, detector.compute_quality_metrics(image))
+
+
+def test_score_batch_paths_match_single_image(tmp_path, detector):
+    paths = []
+    for k, image in enumerate(list(_images(2)) + list(_images(2, h=64, w=80, seed=2))):
+        path = str(tmp_path / f"image_{k}.png")
+        cv2.imwrite(path, cv2.cvtColor(image, cv2.COLOR_RGB2BGR))
+        paths.append(path)
+    paths.append(str(tmp_path / "missing.png"))
+
+    results = detector.score_batch(paths, chunk_size=3)
+    assert results[-1] == {"error": "Could not load image"}
+    for path, result in zip(paths[:-1], results):
+        expected = detector.assess_quality(path, detector.compute_quality_metrics(detector.load_image(path)))
+        assert result == expected
@@ -0,0 +1,109 @@
+import cv2
+import numpy as np
+
+# Texture descriptors: gray-level co-occurrence matrices (GLCM) and uniform
+# local binary patterns (LBP). Both run on an aspect-preserving proxy whose
+# long side is at most PROXY_MAX_SIDE. With 16 gray levels a quantized pixel
+# pair packs into one byte, so each offset's GLCM is a 256-bin histogram of a
+# uint8 image; LBP codes come from eight shifted comparisons and are folded
+# into uniform labels with np.bincount. No Python loop touches pixels.
+
+PROXY_MAX_SIDE = 512
+GLCM_LEVELS = 16
+# Distance-1 neighbours at 0, 45, 90 and 135 degrees as (dy, dx)
+GLCM_OFFSETS = ((0, 1), (-1, 1), (-1, 0), (-1, -1))
+GLCM_PROPERTIES = ("contrast", "dissimilarity", "homogeneity", "energy", "correlation")
+# Circular 8-neighbourhood, radius 1
+LBP_NEIGHBOURS = ((-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1))
+LBP_BINS = len(LBP_NEIGHBOURS) + 2
+
+
+def _uniform_lbp_table():
+    """Map 8-bit LBP codes to uniform labels: number of ones, or P + 1 if not uniform"""
+    table = np.empty(256, np.intp)
+    for code in range(256):
+        bits = [(code >> i) & 1 for i in range(8)]
+        transitions = sum(bits[i] != bits[(i + 1) % 8] for i in range(8))
+        table[code] = sum(bits) if transitions <= 2 else len(LBP_NEIGHBOURS) + 1
+    return table
+
+
+UNIFORM_LBP_TABLE = _uniform_lbp_table()
+_I, _J = np.meshgrid(np.arange(GLCM_LEVELS), np.arange(GLCM_LEVELS), indexing='ij')
+
+
+def texture_proxy(gray, max_side=PROXY_MAX_SIDE):
+    """Downscale by an integer factor so the long side is at most max_side (aspect kept)"""
+    h, w = gray.shape[:2]
+    factor = -(-max(h, w) // max_side)
+    if factor <= 1:
+        return gray
+    # An exact 1/factor scale takes OpenCV's fast box-averaging path for INTER_AREA
+    return cv2.resize(gray, None, fx=1.0 / factor, fy=1.0 / factor, interpolation=cv2.INTER_AREA)
+
+
+def _shifted_pairs(image, dy, dx):
+    """(reference, neighbour) views for all pixels whose neighbour is inside the image"""
+    h, w = image.shape
+    rows = slice(max(-dy, 0), h - max(dy, 0))
+    cols = slice(max(-dx, 0), w - max(dx, 0))
+    neighbour_rows = slice(max(dy, 0), h - max(-dy, 0))
+    neighbour_cols = slice(max(dx, 0), w - max(-dx, 0))
+    return image[rows, cols], image[neighbour_rows, neighbour_cols]
+
+
+def glcm(gray, offsets=GLCM_OFFSETS):
+    """Symmetric, normalized co-occurrence matrices, shape (n_offsets, 16, 16)"""
+    quantized = gray >> 4
+    counts = []
+    for dy, dx in offsets:
+        reference, neighbour = _shifted_pairs(quantized, dy, dx)
+        # Pair code = reference * 16 + neighbour, one byte per pixel pair
+        pairs = np.ascontiguousarray((reference << 4) | neighbour)
+        counts.append(cv2.calcHist([pairs], [0], None, [256], [0, 256]).ravel())
+
+    matrices = np.array(counts, dtype=np.float64).reshape(len(offsets), GLCM_LEVELS, GLCM_LEVELS)
+    matrices += matrices.transpose(0, 2, 1)
+    return matrices / np.maximum(matrices.sum(axis=(1, 2), keepdims=True), 1.0)
+
+
+def glcm_properties(matrices):
+    """GLCM_PROPERTIES averaged over offsets"""
+    difference = (_I - _J).astype(np.float64)
+    contrast = (matrices * difference ** 2).sum(axis=(1, 2))
+    dissimilarity = (matrices * np.abs(difference)).sum(axis=(1, 2))
+    homogeneity = (matrices / (1.0 + difference ** 2)).sum(axis=(1, 2))
+    energy = np.sqrt((matrices ** 2).sum(axis=(1, 2)))
+
+    # Symmetric matrices: row and column marginals share mean and variance
+    mean = (matrices * _I).sum(axis=(1, 2))
+    variance = (matrices * (_I - mean[:, None, None]) ** 2).sum(axis=(1, 2))
+    covariance = (matrices * (_I - mean[:, None, None]) * (_J - mean[:, None, None])).sum(axis=(1, 2))
+    correlation = np.where(variance > 1e-12, covariance / np.maximum(variance, 1e-12), 1.0)
+
+    return [float(np.mean(p)) for p in (contrast, dissimilarity, homogeneity, energy, correlation)]
+
+
+def uniform_lbp_histogram(gray):
+    """Normalized histogram of uniform LBP labels (P + 2 bins) over interior pixels"""
+    h, w = gray.shape
+    centre = gray[1:-1, 1:-1]
+    codes = np.zeros(centre.shape, np.uint8)
+    for bit, (dy, dx) in enumerate(LBP_NEIGHBOURS):
+        neighbour = gray[1 + dy:h - 1 + dy, 1 + dx:w - 1 + dx]
+        codes |= (neighbour >= centre).view(np.uint8) << bit
+
+    # Histogram of raw codes, then fold the 256 codes into uniform labels
+    code_counts = cv2.calcHist([codes], [0], None, [256], [0, 256]).ravel()
+    histogram = np.bincount(UNIFORM_LBP_TABLE, weights=code_counts, minlength=LBP_BINS)
+    return histogram / max(codes.size, 1)
+
+
+def texture_features(gray):
+    """GLCM properties followed by the uniform LBP histogram, on the proxy"""
+    proxy = texture_proxy(gray)
+    if proxy.dtype != np.uint8:
+        proxy = cv2.normalize(proxy, None, 0, 255, cv2.NORM_MINMAX, cv2.CV_8U)
+    if min(proxy.shape) < 3:
+        return [0.0] * (len(GLCM_PROPERTIES) + LBP_BINS)
+    return glcm_properties(glcm(proxy)) + uniform_lbp_histogram(proxy).tolist()